@@ -18,7 +18,7 @@ FONDOS MANUALES (GVC Gaesco, no tienen feed público):
   → Actualiza tú la col H desde el informe mensual de GVC
 """
 
-import sys, re, time, json
+import sys, os, re, time, json
 from datetime import datetime
 from pathlib import Path
 
@@ -30,9 +30,7 @@ except ImportError:
     import openpyxl
     from openpyxl.styles import Font, PatternFill, Alignment
 
-try:
-    import urllib.request as urlreq
-except: pass
+from cliente_http import Client, FetchError
 
 EXCEL_FILE = Path(sys.argv[1]) if len(sys.argv)>1 else Path("cartera_real_gvc.xlsx")
 
@@ -43,93 +41,108 @@ AUTO_FUNDS = {
     "LU0625737910": "Pictet China Index P EUR",
 }
 
+# Conexiones keep-alive por host, gzip, lectura parcial, reintentos y circuit breaker
+HTTP = Client()
+
+RE_VL     = re.compile(r"Valor liquidativo:\s*([\d,.]+)\s*EUR")   # "Valor liquidativo: X,XXXXXX EUR"
+RE_FECHA  = re.compile(r"Fecha:\s*(\d{2}/\d{2}/\d{4})")           # "Fecha: DD/MM/YYYY"
+RE_FINECT = re.compile(r'"nav"\s*:\s*([\d.]+)')
+# Fila de la tabla de históricos: <td>DD/MM/YYYY</td> <td>X,XXXXXX</td>
+RE_HIST_ROW = re.compile(r"(\d{2}/\d{2}/\d{4})\s*</td>\s*<td[^>]*>\s*([\d.,]+)")
+
+QUEFONDOS_BASE = os.environ.get("QUEFONDOS_BASE", "https://www.quefondos.com")
+
 def get_price_quefondos(isin: str) -> tuple[float|None, str]:
     """Obtiene VL de quefondos.com para cualquier fondo con ISIN."""
-    url = f"https://www.quefondos.com/es/fondos/ficha/index.html?isin={isin}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; portfolio-bot/1.0)",
-        "Accept": "text/html",
-    }
+    url = f"{QUEFONDOS_BASE}/es/fondos/ficha/index.html?isin={isin}"
     try:
-        req = urlreq.Request(url, headers=headers)
-        with urlreq.urlopen(req, timeout=10) as r:
-            html = r.read().decode("utf-8", errors="replace")
-        # Pattern: "Valor liquidativo: X,XXXXXX EUR"
-        m = re.search(r"Valor liquidativo:\s*([\d,.]+)\s*EUR", html)
-        if m:
-            price = float(m.group(1).replace(",","."))
-            # Date pattern: "Fecha: DD/MM/YYYY"
-            d = re.search(r"Fecha:\s*(\d{2}/\d{2}/\d{4})", html)
-            date_str = d.group(1) if d else "?"
-            return price, date_str
-    except Exception as e:
-        print(f"    ⚠  Error obteniendo {isin}: {e}")
+        html = HTTP.fetch(url, provider="quefondos", until=[RE_VL, RE_FECHA])
+    except FetchError as e:
+        print(f"    ⚠  Error obteniendo {isin} (quefondos): {e}")
+        return None, "?"
+    m = RE_VL.search(html)
+    if m:
+        price = float(m.group(1).replace(",","."))
+        d = RE_FECHA.search(html)
+        date_str = d.group(1) if d else "?"
+        return price, date_str
+    print(f"    ⚠  quefondos: no aparece el valor liquidativo de {isin}")
     return None, "?"
 
+def _num_es(s: str) -> float:
+    """'1.234,56' / '12,609962' / '12.61' → float"""
+    return float(s.replace(".", "").replace(",", ".")) if "," in s else float(s)
+
+def get_history_quefondos(isin: str, desde: datetime, hasta: datetime) -> list[tuple[datetime, float]]:
+    """Serie diaria de VL de quefondos.com entre dos fechas (ambas incluidas), ordenada."""
+    url = (f"{QUEFONDOS_BASE}/es/fondos/ficha/historico.html?isin={isin}"
+           f"&desde={desde:%d/%m/%Y}&hasta={hasta:%d/%m/%Y}")
+    html = HTTP.fetch(url, provider="quefondos")   # FetchError se propaga: el backfill reintenta luego
+    rows = {}
+    for d, v in RE_HIST_ROW.findall(html):
+        dt = datetime.strptime(d, "%d/%m/%Y")
+        if desde <= dt <= hasta:
+            rows[dt] = _num_es(v)
+    return sorted(rows.items())
+
 def get_price_finect(isin: str) -> tuple[float|None, str]:
     """Fallback: finect.com"""
     url = f"https://www.finect.com/fondos-inversion/{isin}"
     try:
-        req = urlreq.Request(url, headers={"User-Agent":"Mozilla/5.0"})
-        with urlreq.urlopen(req, timeout=10) as r:
-            html = r.read().decode("utf-8", errors="replace")
-        m = re.search(r'"nav"\s*:\s*([\d.]+)', html)
-        if m:
-            return float(m.group(1)), "finect"
-    except: pass
+        html = HTTP.fetch(url, provider="finect", until=[RE_FINECT], headers={"User-Agent": "Mozilla/5.0"})
+    except FetchError as e:
+        print(f"    ⚠  Error obteniendo {isin} (finect): {e}")
+        return None, "?"
+    m = RE_FINECT.search(html)
+    if m:
+        return float(m.group(1)), "finect"
+    print(f"    ⚠  finect: no aparece el NAV de {isin}")
     return None, "?"
 
-def main():
-    if not EXCEL_FILE.exists():
-        print(f"❌  No se encuentra '{EXCEL_FILE}'")
-        sys.exit(1)
-
-    print(f"\n🔄  Actualizando precios en: {EXCEL_FILE}")
-    print(f"    Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
-
-    wb = openpyxl.load_workbook(EXCEL_FILE)
-    ws = wb["📋 ACTIVOS"]
-
-    EUR_FMT = '#,##0.000000\\ "€"'
-    updates  = {}   # isin → (price, date)
-    found    = {}   # row → isin
-
-    # ── Scan ACTIVOS to find rows that match our ISINs (via col Q notes) ──────
+def find_rows(ws) -> dict[int, str]:
+    """Filas de ACTIVOS con ISIN auto-actualizable en las notas (col Q) → {fila: isin}."""
+    found = {}
     for r in range(5, 60):
         notas = str(ws.cell(row=r, column=17).value or "")
         for isin in AUTO_FUNDS:
             if isin in notas:
                 found[r] = isin
+    return found
 
-    if not found:
-        print("⚠  No se encontraron filas con ISIN en columna Notas (col Q).")
-        print("   Asegúrate de tener el Excel correcto (cartera_real_gvc.xlsx).")
-        return
+def fetch_price(isin: str) -> tuple[float|None, str, str]:
+    """(precio, fecha VL, proveedor): quefondos y, si falla, finect."""
+    price, date = get_price_quefondos(isin)
+    if price is not None:
+        return price, date, "quefondos"
+    price, date = get_price_finect(isin)
+    return price, date, "finect"
 
-    # ── Fetch prices ──────────────────────────────────────────────────────────
-    for isin in set(found.values()):
+def fetch_prices(isins, pause: float = 1.0) -> dict[str, tuple[float, str, str]]:
+    """Una ronda de consultas → {isin: (precio, fecha, proveedor)} de las que respondieron."""
+    updates = {}
+    for isin in isins:
         name = AUTO_FUNDS[isin]
         print(f"  🌐  Consultando {name} ({isin})...", end=" ", flush=True)
-        price, date = get_price_quefondos(isin)
-        if price is None:
-            price, date = get_price_finect(isin)
+        price, date, provider = fetch_price(isin)
         if price is not None:
-            updates[isin] = (price, date)
+            updates[isin] = (price, date, provider)
             print(f"✅  {price:.6f} € (VL {date})")
         else:
             print("❌  No se pudo obtener precio")
-        time.sleep(1)   # cortesía con el servidor
+        time.sleep(pause)   # cortesía con el servidor
+    return updates
 
-    if not updates:
-        print("\n❌  No se pudo obtener ningún precio. Revisa la conexión a internet.")
-        return
-
-    # ── Write to Excel ─────────────────────────────────────────────────────────
+def write_prices(wb, found: dict[int, str], updates: dict[str, tuple]):
+    """
+    Escribe los precios en ACTIVOS, recalcula val/gp/rt de esas filas, la fila TOTAL,
+    los pesos y las métricas de INPUTS. Devuelve (filas actualizadas, totales o None).
+    """
+    ws = wb["📋 ACTIVOS"]
     updated_rows = []
     for row, isin in found.items():
         if isin not in updates:
             continue
-        price, date = updates[isin]
+        price, date = updates[isin][:2]
         c = ws.cell(row=row, column=8, value=price)
         c.font = Font(bold=True, size=10, color="0000FF", name="Arial")
         c.fill = PatternFill("solid", fgColor="FFFF99")
@@ -193,21 +206,51 @@ def main():
             c=wsi.cell(row=row,column=2,value=val)
             c.font=Font(size=10,color="000000",name="Arial")
             c.number_format=fmt; c.alignment=Alignment(horizontal="center",vertical="center")
+    return updated_rows, (total_val, total_gp, total_rt) if tot_row else None
 
-    wb.save(EXCEL_FILE)
-
-    # ── Summary ───────────────────────────────────────────────────────────────
+def print_summary(updated_rows, totals):
     print(f"\n{'─'*60}")
     print(f"✅  ACTUALIZACIÓN COMPLETADA — {datetime.now().strftime('%d/%m/%Y %H:%M')}")
     print(f"{'─'*60}")
     for row,name,price,date,val,gp,rt in updated_rows:
         sign = "▲" if rt>=0 else "▼"
         print(f"  {sign} {name[:38]:<38}  {price:>10.4f} €  →  {val:>9.2f} €  ({rt*100:+.2f}%)")
-    if tot_row:
+    if totals:
+        total_val, total_gp, total_rt = totals
         print(f"{'─'*60}")
         print(f"  📊 TOTAL CARTERA:  €{total_val:>10,.2f}  (G/P: €{total_gp:+,.2f} | {total_rt*100:+.2f}%)")
     print(f"\n⚠   Fondos GVC Gaesco: actualiza manualmente la col H desde el informe GVC.")
     print(f"    Luego vuelve a ejecutar este script para recalcular los totales.\n")
 
+def main():
+    if not EXCEL_FILE.exists():
+        print(f"❌  No se encuentra '{EXCEL_FILE}'")
+        sys.exit(1)
+
+    print(f"\n🔄  Actualizando precios en: {EXCEL_FILE}")
+    print(f"    Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
+
+    wb = openpyxl.load_workbook(EXCEL_FILE)
+
+    # ── Scan ACTIVOS to find rows that match our ISINs (via col Q notes) ──────
+    found = find_rows(wb["📋 ACTIVOS"])
+    if not found:
+        print("⚠  No se encontraron filas con ISIN en columna Notas (col Q).")
+        print("   Asegúrate de tener el Excel correcto (cartera_real_gvc.xlsx).")
+        return
+
+    # ── Fetch prices ──────────────────────────────────────────────────────────
+    updates = fetch_prices(set(found.values()))
+    HTTP.close()
+
+    if not updates:
+        print("\n❌  No se pudo obtener ningún precio. Revisa la conexión a internet.")
+        return
+
+    # ── Write to Excel ─────────────────────────────────────────────────────────
+    updated_rows, totals = write_prices(wb, found, updates)
+    wb.save(EXCEL_FILE)
+    print_summary(updated_rows, totals)
+
 if __name__ == "__main__":
     main()
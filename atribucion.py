@@ -0,0 +1,191 @@
+"""
+atribucion.py — Atribución de resultados Brinson-Fachler (asignación / selección / interacción)
+
+Explica la diferencia entre la rentabilidad de la cartera y la de la cartera objetivo
+(pesos objetivo de ⚙️ INPUTS × rentabilidad esperada de cada categoría) en cualquier
+periodo entre dos fechas de asset_history:
+
+    asignación  = (w_p − w_b) · (r_b − R_b)     ¿acertó el peso de cada categoría?
+    selección   =  w_b · (r_p − r_b)            ¿lo hicieron mejor los fondos elegidos?
+    interacción = (w_p − w_b) · (r_p − r_b)
+
+Por categoría y por activo (el efecto de la categoría se reparte según el peso del
+activo dentro de ella). Todos los periodos se calculan a la vez con operaciones
+matriciales de numpy (activos × fechas), así que escala a series diarias largas.
+Los pesos son los del inicio de cada periodo (buy & hold): un activo comprado a mitad
+de periodo no cuenta hasta el siguiente.
+"""
+from datetime import datetime, timedelta
+
+from muestreo import match_name, parse_date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CATS = ("RF", "RV", "CR", "SCR")
+LABEL_TOLERANCE = 7   # días que puede quedar el inicio de YTD/1A/3A antes de su corte
+
+# ── Cartera objetivo ──────────────────────────────────────────────────────────
+def benchmark(inputs):
+    """(pesos objetivo normalizados, rentabilidad anual esperada) por categoría."""
+    tr = inputs.get("target_return", 0)
+    w = {"RF": inputs.get("target_weight_rf", 0), "RV": inputs.get("target_weight_rv", 0),
+         "CR": 0.0, "SCR": inputs.get("target_weight_scr", 0)}
+    r = {"RF": inputs.get("exp_ret_rf") or tr, "RV": inputs.get("exp_ret_rv") or tr, "CR": tr, "SCR": tr}
+    tot = sum(w.values()) or 1
+    return [w[c] / tot for c in CATS], [r[c] for c in CATS]
+
+# ── Matriz de crecimiento ─────────────────────────────────────────────────────
+def growth_matrix(assets, asset_history, now=None):
+    """
+    Devuelve (fechas, G, held, buy):
+      fechas  [inicio, fechas de asset_history…, hoy] (datetime; inicio = primera compra)
+      G       activos × fechas: valor de 1 € invertido al comprar (1 + rt acumulada),
+              rellenando hacia delante las fechas sin dato
+      held    activos × fechas: True si el activo ya estaba comprado en esa fecha
+      buy     ordinal de la fecha de compra de cada activo
+    """
+    now = now or datetime.now()
+    buys = [parse_date(a.get("fecha_inicio")) for a in assets]
+    parsed = {s: parse_date(s) for s in {p["date"] for pts in asset_history.values() for p in pts}}
+    hist_dates = sorted({d for d in parsed.values() if d is not None and d < now})
+    first = min([b for b in buys if b] + hist_dates + [now])
+    dates = [first] + [d for d in hist_dates if d > first] + [now]
+    col = {d: j for j, d in enumerate(dates)}
+
+    G = np.full((len(assets), len(dates)), np.nan)
+    G[:, 0] = 1.0
+    G[:, -1] = [1 + a["rt"] for a in assets]
+    names = list(asset_history)
+    for i, a in enumerate(assets):
+        key = match_name(a["name"], names)
+        for p in asset_history.get(key, []) if key else []:
+            j = col.get(parsed[p["date"]])
+            if j and j < len(dates) - 1 and p.get("rt") is not None:
+                G[i, j] = 1 + p["rt"]
+
+    # Forward-fill por filas: índice de la última columna con dato
+    idx = np.where(np.isnan(G), 0, np.arange(len(dates)))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    G = G[np.arange(len(assets))[:, None], idx]
+
+    buy = np.array([(b or first).toordinal() for b in buys])
+    held = buy[:, None] <= np.array([d.toordinal() for d in dates])[None, :]
+    held[:, 0] = True   # "desde inicio": todo el capital invertido cuenta desde el principio
+    return dates, G, held, buy
+
+# ── Brinson-Fachler ───────────────────────────────────────────────────────────
+def brinson(wp, wb, rp, rb):
+    """Arrays (…, categorías) → (asignación, selección, interacción) con la misma forma."""
+    Rb = (wb * rb).sum(axis=-1, keepdims=True)
+    return (wp - wb) * (rb - Rb), wb * (rp - rb), (wp - wb) * (rp - rb)
+
+def _div(a, b):
+    return np.divide(a, b, out=np.zeros(np.broadcast_shapes(a.shape, b.shape)), where=b != 0)
+
+def default_periods(dates):
+    """
+    Periodos por defecto [(etiqueta, i0, i1)] hasta la última fecha: desde inicio, año en
+    curso, 1 y 3 años y primera→última fecha de asset_history. Un número fijo aunque la
+    serie sea diaria; los que empezarían en la misma fecha que otro se omiten.
+    YTD/1A/3A empiezan en la última fecha anterior al corte; si queda a más de
+    LABEL_TOLERANCE días (serie con huecos) el periodo se etiqueta None y se muestra
+    con sus fechas reales.
+    """
+    n, last = len(dates), dates[-1]
+    def start_before(label, cutoff):
+        j = max((j for j, d in enumerate(dates) if d <= cutoff), default=None)
+        if j is None or j == n - 1:
+            return None, None
+        return (label if (cutoff - dates[j]).days <= LABEL_TOLERANCE else None), j
+    cand = [("Inicio", 0),
+            start_before("YTD", datetime(last.year, 1, 1) - timedelta(microseconds=1)),
+            start_before("1A", last - timedelta(days=365)),
+            start_before("3A", last - timedelta(days=3 * 365)),
+            ("Histórico", 1 if n > 3 else None)]
+    out, seen = [], set()
+    for label, j in cand:
+        if j is not None and j not in seen:
+            seen.add(j)
+            out.append((label, j, n - 1))
+    return out
+
+def attribution(assets, asset_history, inputs, pairs=None, now=None):
+    """
+    Atribución para los periodos `pairs` = [(i0, i1)] de índices sobre las fechas de
+    growth_matrix (por defecto los de default_periods(), con su etiqueta).
+    Devuelve una lista de dicts serializables (uno por periodo), o None sin numpy.
+    """
+    if np is None or not assets:
+        return None
+    dates, G, held, buy = growth_matrix(assets, asset_history, now)
+    if pairs is None:
+        labels, pairs = zip(*[(label, (a, b)) for label, a, b in default_periods(dates)])
+    else:
+        labels = [None] * len(pairs)
+    i0, i1 = np.array([p[0] for p in pairs]), np.array([p[1] for p in pairs])
+
+    # Activos (A) × categorías (K), periodos (P)
+    C = np.array([[a["cat"] == c for c in CATS] for a in assets], dtype=float)   # A×K
+    inv = np.array([a["invested"] for a in assets])
+    V0 = (inv[:, None] * G[:, i0] * held[:, i0]).T                               # P×A
+    ra = (G[:, i1] / G[:, i0] - 1).T                                              # P×A
+    Vc = V0 @ C                                                                   # P×K
+    wp = _div(Vc, Vc.sum(axis=1, keepdims=True))
+    rp = _div((V0 * ra) @ C, Vc)
+
+    # Referencia: rentabilidad esperada de la categoría durante los días que se tuvo
+    # cada activo (en "desde inicio" cada uno cuenta desde su compra)
+    cat_of = C.argmax(axis=1)
+    wb_, rann = benchmark(inputs)
+    ords = np.array([d.toordinal() for d in dates])
+    days = (ords[i1] - ords[i0]).astype(float)                                    # P
+    days_a = np.clip(ords[i1][:, None] - np.maximum(ords[i0][:, None], buy[None, :]), 0, None)
+    rb_a = (1 + np.array(rann)[cat_of])[None, :] ** (days_a / 365.25) - 1         # P×A
+    rb_full = (1 + np.array(rann))[None, :] ** (days[:, None] / 365.25) - 1       # P×K
+    rb = np.where(Vc > 0, _div((V0 * rb_a) @ C, Vc), rb_full)
+    wb = np.broadcast_to(np.array(wb_), wp.shape)
+    alloc, sel, inter = brinson(wp, wb, rp, rb)
+    eff_days = np.where(V0.sum(axis=1) > 0, _div((V0 * days_a).sum(axis=1), V0.sum(axis=1)), days)
+
+    # Reparto por activo según su peso dentro de la categoría (las categorías sin
+    # posiciones en el periodo solo tienen efecto de asignación a nivel de categoría)
+    w_in = _div(V0, Vc[:, cat_of])                                                # P×A
+    ex = ra - rb_a
+    a_alloc = alloc[:, cat_of] * w_in
+    a_sel = wb[:, cat_of] * w_in * ex
+    a_inter = (wp - wb)[:, cat_of] * w_in * ex
+
+    Rp, Rb = (wp * rp).sum(axis=1), (wb * rb).sum(axis=1)
+    fmt = lambda d, j: "inicio" if j == 0 else d.strftime("%d/%m/%Y")
+    r6 = lambda v: round(float(v), 6)
+    out = []
+    for p, (a, b) in enumerate(pairs):
+        # Solo se anualiza a partir de un año (menos distorsiona)
+        ann = lambda r: r6((1 + r) ** (365.25 / eff_days[p]) - 1) if eff_days[p] >= 365 and r > -1 else None
+        cats = {c: {"w_p": r6(wp[p, k]), "w_b": r6(wb[p, k]), "r_p": r6(rp[p, k]), "r_b": r6(rb[p, k]),
+                    "allocation": r6(alloc[p, k]), "selection": r6(sel[p, k]), "interaction": r6(inter[p, k])}
+                for k, c in enumerate(CATS) if wp[p, k] or wb[p, k]}
+        rows = [{"name": assets[i]["name"], "cat": assets[i]["cat"], "w_p": r6(V0[p, i] / V0[p].sum()),
+                 "r": r6(ra[p, i]), "allocation": r6(a_alloc[p, i]), "selection": r6(a_sel[p, i]),
+                 "interaction": r6(a_inter[p, i])}
+                for i in range(len(assets)) if V0[p, i] > 0]
+        rows.sort(key=lambda x: x["allocation"] + x["selection"] + x["interaction"], reverse=True)
+        out.append({
+            "label": labels[p], "start": fmt(dates[a], a), "end": dates[b].strftime("%d/%m/%Y"), "days": int(days[p]),
+            "portfolio": r6(Rp[p]), "benchmark": r6(Rb[p]), "active": r6(Rp[p] - Rb[p]),
+            "portfolio_ann": ann(Rp[p]), "benchmark_ann": ann(Rb[p]),
+            "allocation": r6(alloc[p].sum()), "selection": r6(sel[p].sum()),
+            "interaction": r6(inter[p].sum()),
+            "categories": cats, "assets": rows,
+        })
+    return out
+
+def attribution_report(assets, asset_history, inputs, now=None):
+    """Bloque "attribution" de data.json (None si no está instalado numpy)."""
+    periods = attribution(assets, asset_history, inputs, now=now)
+    if periods is None:
+        return None
+    return {"target_return": inputs.get("target_return", 0), "periods": periods}
@@ -0,0 +1,180 @@
+"""
+cliente_http.py — Cliente HTTP para los scrapers de precios (solo librería estándar)
+
+  • Conexiones persistentes (keep-alive) reutilizadas por host
+  • Pide gzip y lo descomprime al vuelo
+  • Lee el cuerpo por trozos y corta en cuanto casan todos los patrones buscados. Si lo
+    que falta por llegar son como mucho DRAIN_MAX bytes (lo normal con gzip) se lee y
+    descarta para devolver la conexión al pool; si es más, cuesta menos cerrar la
+    conexión y abrir otra (un RTT más, o dos con TLS) que descargar el resto
+  • Reintentos con backoff exponencial + jitter y circuit breaker por proveedor
+    (solo red, timeouts, 429 y 5xx cuentan como fallo del proveedor)
+  • Los errores se propagan como FetchError (nada de `except: pass`)
+
+USO:
+    http = Client()
+    html = http.fetch(url, provider="quefondos", until=[re.compile(r"…")])
+"""
+import codecs, http.client, random, ssl, time, zlib
+from urllib.parse import urlsplit
+
+USER_AGENT = "Mozilla/5.0 (compatible; portfolio-bot/1.0)"
+CHUNK      = 8192
+DRAIN_MAX  = 64 * 1024   # bytes sin leer que aún compensa descartar para reutilizar la conexión
+RETRYABLE  = {429, 500, 502, 503, 504}
+
+class FetchError(Exception):
+    """No se pudo obtener la página (red, HTTP o proveedor bloqueado)."""
+
+class CircuitOpenError(FetchError):
+    """El proveedor ha fallado demasiadas veces seguidas; se omite hasta el cooldown."""
+
+class _Retryable(FetchError):
+    """Fallo transitorio (red, timeout, 429/5xx): se reintenta."""
+
+# ── Circuit breaker ───────────────────────────────────────────────────────────
+class CircuitBreaker:
+    """Tras `threshold` fallos seguidos se abre `cooldown` segundos; luego deja pasar una prueba."""
+    def __init__(self, name, threshold=3, cooldown=300):
+        self.name, self.threshold, self.cooldown = name, threshold, cooldown
+        self.failures  = 0
+        self.opened_at = None
+
+    def check(self):
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at < self.cooldown:
+            raise CircuitOpenError(f"{self.name}: circuito abierto tras {self.failures} fallos")
+        self.opened_at = None   # half-open: se permite un intento
+
+    def success(self):
+        self.failures, self.opened_at = 0, None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+# ── Pool de conexiones ────────────────────────────────────────────────────────
+class Client:
+    def __init__(self, timeout=10, retries=3, backoff=0.5, user_agent=USER_AGENT,
+                 breaker_threshold=3, breaker_cooldown=300):
+        self.timeout, self.retries, self.backoff = timeout, retries, backoff
+        self.user_agent = user_agent
+        self._idle     = {}   # (scheme, host, port) → [conexiones libres]
+        self._breakers = {}
+        self._breaker_args = (breaker_threshold, breaker_cooldown)
+        self._ssl = ssl.create_default_context()
+
+    def breaker(self, provider):
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(provider, *self._breaker_args)
+        return self._breakers[provider]
+
+    def _acquire(self, key):
+        pool = self._idle.get(key)
+        if pool:
+            return pool.pop()
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, key, conn):
+        self._idle.setdefault(key, []).append(conn)
+
+    def close(self):
+        for pool in self._idle.values():
+            for conn in pool:
+                conn.close()
+        self._idle.clear()
+
+    # ── Petición ──────────────────────────────────────────────────────────────
+    def _get_once(self, url, until, headers):
+        u = urlsplit(url)
+        key = (u.scheme, u.hostname, u.port or (443 if u.scheme == "https" else 80))
+        path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        hdrs = {"User-Agent": self.user_agent, "Accept": "text/html",
+                "Accept-Encoding": "gzip", "Connection": "keep-alive", **(headers or {})}
+
+        conn = self._acquire(key)
+        try:
+            try:
+                conn.request("GET", path, headers=hdrs)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # La conexión reutilizada la cerró el servidor: una sola reconexión inmediata
+                conn.close()
+                conn.request("GET", path, headers=hdrs)
+                resp = conn.getresponse()
+
+            if resp.status >= 400:
+                resp.read()
+                self._release(key, conn); conn = None
+                raise FetchError(f"HTTP {resp.status} en {url}") if resp.status not in RETRYABLE \
+                    else _Retryable(f"HTTP {resp.status} en {url}")
+
+            gz  = zlib.decompressobj(16 + zlib.MAX_WBITS) if resp.getheader("Content-Encoding", "").lower() == "gzip" else None
+            try:
+                dec = codecs.getincrementaldecoder(resp.headers.get_content_charset() or "utf-8")(errors="replace")
+            except LookupError:   # charset desconocido: como los navegadores, se lee como UTF-8
+                dec = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            text, done = [], False
+            while True:
+                chunk = resp.read(CHUNK)
+                if not chunk:
+                    break
+                if gz:
+                    chunk = gz.decompress(chunk)
+                text.append(dec.decode(chunk))
+                if until and all(p.search("".join(text)) for p in until):
+                    done = True
+                    break
+            if gz and not done:
+                text.append(dec.decode(gz.flush(), final=True))
+
+            if done and not resp.isclosed() and not self._drain(resp):
+                conn.close()          # demasiado cuerpo sin leer: la conexión no se reutiliza
+            else:
+                self._release(key, conn)
+            conn = None
+            return "".join(text)
+        except (OSError, http.client.HTTPException, zlib.error) as e:
+            raise _Retryable(f"{type(e).__name__}: {e}") from e
+        finally:
+            if conn is not None:
+                conn.close()
+
+    @staticmethod
+    def _drain(resp):
+        """Lee y descarta el resto del cuerpo si son ≤ DRAIN_MAX bytes. True si terminó."""
+        if resp.length is not None and resp.length > DRAIN_MAX:
+            return False
+        left = DRAIN_MAX
+        while left > 0:
+            chunk = resp.read(min(CHUNK, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+        return resp.isclosed()
+
+    def fetch(self, url, provider=None, until=None, headers=None):
+        """
+        GET con reintentos. `until` = lista de regex compiladas: la lectura se detiene en
+        cuanto todas casan. Lanza FetchError / CircuitOpenError si no hay respuesta válida.
+        Un 4xx es un resultado de esa URL, no un fallo del proveedor: no cuenta para el breaker.
+        """
+        breaker = self.breaker(provider or urlsplit(url).hostname)
+        breaker.check()
+        for attempt in range(self.retries + 1):
+            try:
+                text = self._get_once(url, until, headers)
+                breaker.success()
+                return text
+            except _Retryable as e:
+                last = e
+                if attempt < self.retries:
+                    # Full jitter: espera aleatoria en [0, backoff·2^intento]
+                    time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        breaker.failure()
+        raise FetchError(f"{url}: {last} (tras {self.retries + 1} intentos)")
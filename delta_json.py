@@ -0,0 +1,172 @@
+"""
+delta_json.py — Deltas entre versiones consecutivas de data.json (RFC 6902 JSON Patch)
+
+Cada ejecución de parse_excel.py guarda en public/versions/ el parche que lleva de la
+versión anterior a la nueva:
+    versions/manifest.json          {"latest": id, "chain": [id más antiguo, …, latest]}
+    versions/patches/<from>.json    {"from": id, "to": id, "patch": [ops…]}
+El cliente envía su versión y recibe solo las operaciones pendientes (o el payload completo
+si la cadena es demasiado larga o su versión ya no existe).
+"""
+import copy, hashlib, json, os
+
+MAX_CHAIN = 30   # parches que se conservan; más allá, el cliente descarga data.json entero
+
+# ── Versión ───────────────────────────────────────────────────────────────────
+# Rutas que no cuentan para la versión: cambian en cada ejecución aunque el Excel no cambie
+VOLATILE = ("/version", "/generated", "/summary/updated_at")
+
+def _drop(doc, toks):
+    if not isinstance(doc, dict) or toks[0] not in doc:
+        return doc
+    doc = dict(doc)
+    if len(toks) == 1:
+        del doc[toks[0]]
+    else:
+        doc[toks[0]] = _drop(doc[toks[0]], toks[1:])
+    return doc
+
+def version_id(doc):
+    """
+    Hash estable del documento sin las rutas VOLATILE: regenerar data.json sin cambios
+    en el Excel da la misma versión (y record_version no guarda parche).
+    """
+    body = doc
+    for path in VOLATILE:
+        body = _drop(body, _tokens(path))
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+# ── JSON Pointer ──────────────────────────────────────────────────────────────
+def _esc(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def _tokens(path):
+    return [t.replace("~1", "/").replace("~0", "~") for t in path.split("/")[1:]]
+
+# ── Diff ──────────────────────────────────────────────────────────────────────
+def make_patch(a, b, path=""):
+    """Operaciones add/remove/replace que transforman a en b."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        ops = []
+        for k in a:
+            if k not in b:
+                ops.append({"op": "remove", "path": f"{path}/{_esc(k)}"})
+        for k, v in b.items():
+            if k not in a:
+                ops.append({"op": "add", "path": f"{path}/{_esc(k)}", "value": v})
+            else:
+                ops += make_patch(a[k], v, f"{path}/{_esc(k)}")
+        return ops
+    if isinstance(a, list) and isinstance(b, list):
+        ops = []
+        common = min(len(a), len(b))
+        for i in range(common):
+            ops += make_patch(a[i], b[i], f"{path}/{i}")
+        # Cola: se añade al final ("-") o se borra de atrás hacia delante
+        for v in b[common:]:
+            ops.append({"op": "add", "path": f"{path}/-", "value": v})
+        for i in range(len(a) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        return ops
+    if a == b and type(a) is type(b):
+        return []
+    return [{"op": "replace", "path": path, "value": b}]
+
+# ── Apply ─────────────────────────────────────────────────────────────────────
+def apply_patch(doc, patch):
+    """Aplica un parche (add/remove/replace) sobre una copia de doc."""
+    doc = copy.deepcopy(doc)
+    for op in patch:
+        toks = _tokens(op["path"])
+        if not toks:
+            if op["op"] == "remove":
+                raise ValueError("No se puede borrar la raíz")
+            doc = copy.deepcopy(op["value"])
+            continue
+        parent = doc
+        for t in toks[:-1]:
+            parent = parent[int(t)] if isinstance(parent, list) else parent[t]
+        last = toks[-1]
+        if isinstance(parent, list):
+            if op["op"] == "add":
+                idx = len(parent) if last == "-" else int(last)
+                parent.insert(idx, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[int(last)]
+            elif op["op"] == "replace":
+                parent[int(last)] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"Operación no soportada: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                if op["op"] == "replace" and last not in parent:
+                    raise KeyError(op["path"])
+                parent[last] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"Operación no soportada: {op['op']}")
+    return doc
+
+# ── Almacén de versiones ──────────────────────────────────────────────────────
+def _manifest_path(vdir):
+    return os.path.join(vdir, "manifest.json")
+
+def load_manifest(vdir):
+    try:
+        with open(_manifest_path(vdir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"latest": None, "chain": []}
+
+def record_version(vdir, prev, new):
+    """
+    Guarda el parche prev → new y actualiza el manifiesto. `prev` puede ser None
+    (primera ejecución). Devuelve el número de operaciones del parche (0 si no hay cambio).
+    """
+    os.makedirs(os.path.join(vdir, "patches"), exist_ok=True)
+    man = load_manifest(vdir)
+    new_id = new["version"]
+    if prev is None:
+        man = {"latest": new_id, "chain": [new_id]}
+        n_ops = 0
+    else:
+        prev_id = prev.get("version") or version_id(prev)
+        if prev_id == new_id:
+            return 0
+        patch = make_patch({k: v for k, v in prev.items() if k != "version"},
+                           {k: v for k, v in new.items() if k != "version"})
+        with open(os.path.join(vdir, "patches", f"{prev_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({"from": prev_id, "to": new_id, "patch": patch}, f,
+                      ensure_ascii=False, separators=(",", ":"), default=str)
+        chain = man["chain"] if man["chain"] and man["chain"][-1] == prev_id else [prev_id]
+        man = {"latest": new_id, "chain": (chain + [new_id])[-(MAX_CHAIN + 1):]}
+        n_ops = len(patch)
+
+    # Parches fuera de la cadena ya no se pueden servir
+    keep = set(man["chain"][:-1])
+    for fn in os.listdir(os.path.join(vdir, "patches")):
+        if fn.endswith(".json") and fn[:-5] not in keep:
+            os.remove(os.path.join(vdir, "patches", fn))
+    with open(_manifest_path(vdir), "w", encoding="utf-8") as f:
+        json.dump(man, f, indent=2)
+    return n_ops
+
+def delta_since(vdir, since):
+    """
+    Operaciones acumuladas desde `since` hasta la última versión, o None si el cliente
+    debe descargar el payload completo (versión desconocida o cadena demasiado larga).
+    """
+    man = load_manifest(vdir)
+    chain = man["chain"]
+    if since not in chain:
+        return None
+    ops = []
+    for vid in chain[chain.index(since):-1]:
+        try:
+            with open(os.path.join(vdir, "patches", f"{vid}.json"), encoding="utf-8") as f:
+                ops += json.load(f)["patch"]
+        except (OSError, ValueError, KeyError):
+            return None
+    return ops
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+exportar_arrow.py — Exporta assets / history / asset_history a Arrow IPC y Parquet
+
+Esquema estable (SCHEMA_VERSION) para cargar la cartera en pandas / DuckDB / polars sin
+parsear data.json: los .arrow (IPC sin comprimir) se abren con memory-map sin copiar, y
+los .parquet sirven para consultas y archivo. Distribución particionada por cartera
+(estilo Hive), así varias carteras forman un único dataset:
+
+    arrow/assets/portfolio=<nombre>/data.arrow | data.parquet
+    arrow/history/portfolio=<nombre>/…
+    arrow/asset_history/portfolio=<nombre>/…
+
+USO:
+    python parse_excel.py cartera.xlsx --arrow        # data.json + partición "cartera"
+    python exportar_arrow.py a/data.json b/data.json   # lote: una partición por archivo
+
+    from exportar_arrow import load
+    data = load("arrow", "cartera")   # {"assets": [...], "history": [...], "asset_history": {...}}
+
+    -- DuckDB
+    SELECT * FROM read_parquet('arrow/assets/*/*.parquet', hive_partitioning = true);
+"""
+import glob, json, os, sys
+
+from muestreo import parse_date
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+SCHEMA_VERSION = "1"
+ARROW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arrow")
+
+# ── Esquemas ──────────────────────────────────────────────────────────────────
+# "date" es la fecha tipada para consultar; "date_label" conserva el texto original
+# del Excel para que load() devuelva exactamente lo mismo que data.json.
+def _schemas():
+    f64, txt = pa.float64(), pa.string()
+    return {
+        "assets": pa.schema([
+            ("name", txt), ("cat", pa.dictionary(pa.int8(), txt)),
+            ("titles", f64), ("buy_px", f64), ("invested", f64), ("price_now", f64),
+            ("val", f64), ("gp", f64), ("rt", f64), ("ytd", f64), ("mtd", f64), ("weight", f64),
+            ("fecha_inicio", txt), ("notas", txt),
+        ]),
+        "history": pa.schema([
+            ("date", pa.date32()), ("date_label", txt),
+            ("val", f64), ("inv", f64), ("gp", f64), ("rt", f64),
+            ("w_rf", f64), ("w_rv", f64), ("notes", txt),
+        ]),
+        "asset_history": pa.schema([
+            ("name", txt), ("date", pa.date32()), ("date_label", txt), ("rt", f64),
+        ]),
+    }
+
+def _date(s):
+    d = parse_date(s)
+    return d.date() if d else None
+
+def _rows(output, table):
+    if table == "assets":
+        return output.get("assets", [])
+    if table == "history":
+        return [{**h, "date": _date(h.get("date")), "date_label": str(h.get("date", ""))}
+                for h in output.get("history", [])]
+    return [{"name": name, "date": _date(p.get("date")), "date_label": str(p.get("date", "")), "rt": p.get("rt")}
+            for name, pts in output.get("asset_history", {}).items() for p in pts]
+
+def to_tables(output):
+    """output de parse_excel → {tabla: pyarrow.Table} con el esquema estable."""
+    meta = {"schema_version": SCHEMA_VERSION, "generated": output.get("generated", ""),
+            "source": output.get("source", "")}
+    tables = {}
+    for name, schema in _schemas().items():
+        rows = _rows(output, name)
+        cols = {}
+        for field in schema:
+            vals = [r.get(field.name) for r in rows]
+            if pa.types.is_floating(field.type):
+                vals = [float(v) if isinstance(v, (int, float)) else None for v in vals]
+            elif pa.types.is_string(field.type) or pa.types.is_dictionary(field.type):
+                vals = [None if v is None else str(v) for v in vals]
+            cols[field.name] = pa.array(vals, type=field.type)
+        tables[name] = pa.table(cols, schema=schema.with_metadata(meta))
+    return tables
+
+# ── Escritura ─────────────────────────────────────────────────────────────────
+def _safe(portfolio):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in portfolio) or "default"
+
+def export(output, portfolio, out_dir=ARROW_DIR, formats=("arrow", "parquet")):
+    """
+    Escribe (o reemplaza) la partición `portfolio` de cada tabla. Devuelve las rutas
+    escritas. Lanza RuntimeError si pyarrow no está instalado.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow no está instalado (pip install pyarrow)")
+    written = []
+    for table, t in to_tables(output).items():
+        part = os.path.join(out_dir, table, f"portfolio={_safe(portfolio)}")
+        os.makedirs(part, exist_ok=True)
+        for fmt in formats:
+            path = os.path.join(part, f"data.{fmt}")
+            tmp = path + ".tmp"
+            if fmt == "arrow":
+                with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, t.schema) as w:
+                    w.write_table(t)
+            else:
+                pq.write_table(t, tmp, compression="zstd")
+            os.replace(tmp, path)
+            written.append(path)
+    return written
+
+# ── Lectura ───────────────────────────────────────────────────────────────────
+def read_table(table, portfolio, out_dir=ARROW_DIR):
+    """Tabla de una cartera: .arrow con memory-map (sin copia) o, si no existe, .parquet."""
+    part = os.path.join(out_dir, table, f"portfolio={_safe(portfolio)}")
+    path = os.path.join(part, "data.arrow")
+    if os.path.exists(path):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pq.read_table(os.path.join(part, "data.parquet"), memory_map=True)
+
+def portfolios(out_dir=ARROW_DIR):
+    base = os.path.join(out_dir, "assets")
+    return sorted(d.split("=", 1)[1] for d in os.listdir(base) if d.startswith("portfolio=")) \
+        if os.path.isdir(base) else []
+
+def load(out_dir=ARROW_DIR, portfolio=None):
+    """
+    Mismas estructuras que data.json: {"assets": [...], "history": [...], "asset_history": {...}}.
+    Sin `portfolio` devuelve {cartera: estructuras} para todas las particiones.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow no está instalado (pip install pyarrow)")
+    if portfolio is None:
+        return {p: load(out_dir, p) for p in portfolios(out_dir)}
+    assets = read_table("assets", portfolio, out_dir).to_pylist()
+    history = [{"date": r.pop("date_label"), **{k: v for k, v in r.items() if k != "date"}}
+               for r in read_table("history", portfolio, out_dir).to_pylist()]
+    asset_history = {}
+    for r in read_table("asset_history", portfolio, out_dir).to_pylist():
+        asset_history.setdefault(r["name"], []).append({"date": r["date_label"], "rt": r["rt"]})
+    return {"assets": assets, "history": history, "asset_history": asset_history}
+
+def dataset(table, out_dir=ARROW_DIR, fmt="parquet"):
+    """pyarrow.dataset con todas las carteras (columna "portfolio" de la partición)."""
+    import pyarrow.dataset as ds
+    base = os.path.join(out_dir, table)
+    files = sorted(glob.glob(os.path.join(base, "portfolio=*", f"data.{fmt}")))
+    return ds.dataset(files, format="ipc" if fmt == "arrow" else fmt,
+                      partitioning="hive", partition_base_dir=base)
+
+# ── CLI: exportación por lotes desde data.json ────────────────────────────────
+def main(paths):
+    if pa is None:
+        print("ERROR: pyarrow no está instalado (pip install pyarrow)")
+        sys.exit(1)
+    if not paths:
+        print("USO: python exportar_arrow.py data.json [otro/data.json ...]")
+        sys.exit(1)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            output = json.load(f)
+        name = os.path.splitext(output.get("source") or os.path.basename(os.path.dirname(os.path.abspath(path))))[0]
+        export(output, name)
+        print(f"✅  {path} → {ARROW_DIR} (portfolio={_safe(name)})")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
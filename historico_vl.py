@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+historico_vl.py
+===============
+Descarga el histórico diario completo de valor liquidativo (VL) de todos los ISIN
+que aparecen en las notas de ACTIVOS (col Q) y lo guarda en un almacén local compacto.
+
+USO:
+    python historico_vl.py
+    python historico_vl.py mi_cartera.xlsx   # ruta personalizada
+
+  • Reanudable: tras cada tramo descargado se guarda la serie y el checkpoint, así que
+    una ejecución interrumpida continúa donde se quedó
+  • Incremental: en ejecuciones posteriores solo se piden los días que faltan
+    (posteriores a la última fecha guardada y, si aún no se llegó al lanzamiento del
+    fondo, los anteriores a la más antigua)
+
+ALMACÉN (historico_vl/):
+    <ISIN>.vl          columnar: cabecera + int32 ordinales de fecha + float64 VL
+    checkpoint.json    {ISIN: {"back_to": "YYYY-MM-DD", "inception": bool, "empty": n, "updated": …}}
+
+El lanzamiento se da por alcanzado tras EMPTY_CHUNKS tramos vacíos seguidos anteriores a
+la primera fecha guardada. Con la serie aún vacía los tramos vacíos no cuentan: se sigue
+retrocediendo hasta MAX_EMPTY_PROBE tramos (fondos que dejaron de publicar hace más de un
+año) y, si no aparece nada (ISIN sin datos o fallo del proveedor), se vuelve a intentar
+en la siguiente ejecución.
+"""
+import json, os, re, struct, sys
+from array import array
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from actualizar_precios import EXCEL_FILE, HTTP, get_history_quefondos
+from cliente_http import FetchError
+
+STORE_DIR  = Path(__file__).resolve().parent / "historico_vl"
+CHECKPOINT = STORE_DIR / "checkpoint.json"
+CHUNK_DAYS = 365          # días por petición
+EMPTY_CHUNKS = 2          # tramos vacíos seguidos antes de la primera fecha = lanzamiento
+MAX_EMPTY_PROBE = 10      # tramos vacíos que se recorren sin serie antes de desistir
+MAGIC      = b"VL01"
+HEADER     = struct.Struct("<4sI")   # magic, nº de puntos
+RE_ISIN    = re.compile(r"\b[A-Z]{2}[A-Z0-9]{9}\d\b")
+
+# ── Almacén columnar ──────────────────────────────────────────────────────────
+def _write_atomic(path, data):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def load_series(isin, store=STORE_DIR):
+    """(fechas: array('i') de date.toordinal(), vl: array('d')), ordenadas por fecha."""
+    days, navs = array("i"), array("d")
+    try:
+        raw = (store / f"{isin}.vl").read_bytes()
+    except FileNotFoundError:
+        return days, navs
+    magic, n = HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{isin}.vl: formato desconocido")
+    off = HEADER.size
+    days.frombytes(raw[off:off + 4 * n]); off += 4 * n
+    navs.frombytes(raw[off:off + 8 * n])
+    if sys.byteorder == "big":
+        days.byteswap(); navs.byteswap()
+    return days, navs
+
+def save_series(isin, days, navs, store=STORE_DIR):
+    d, v = array("i", days), array("d", navs)
+    if sys.byteorder == "big":
+        d.byteswap(); v.byteswap()
+    _write_atomic(store / f"{isin}.vl", HEADER.pack(MAGIC, len(d)) + d.tobytes() + v.tobytes())
+
+def merge(days, navs, rows):
+    """Incorpora [(datetime, vl)] a la serie; los días ya presentes se sobrescriben."""
+    pts = dict(zip(days, navs))
+    pts.update((dt.toordinal(), v) for dt, v in rows)
+    keys = sorted(pts)
+    return array("i", keys), array("d", (pts[k] for k in keys))
+
+# ── Checkpoint ────────────────────────────────────────────────────────────────
+def load_checkpoint(path=CHECKPOINT):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_checkpoint(ck, path=CHECKPOINT):
+    _write_atomic(path, json.dumps(ck, indent=2, sort_keys=True).encode("utf-8"))
+
+# ── ISINs de la cartera ───────────────────────────────────────────────────────
+def find_isins(excel_file):
+    import openpyxl
+    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    ws = wb["📋 ACTIVOS"]
+    isins = []
+    for (notas,) in ws.iter_rows(min_row=5, max_row=60, min_col=17, max_col=17, values_only=True):
+        for isin in RE_ISIN.findall(str(notas or "")):
+            if isin not in isins:
+                isins.append(isin)
+    wb.close()
+    return isins
+
+# ── Backfill ──────────────────────────────────────────────────────────────────
+def _ranges_back(cursor, stop=None):
+    """Tramos de CHUNK_DAYS hacia atrás desde cursor (incluido)."""
+    while stop is None or cursor >= stop:
+        start = cursor - timedelta(days=CHUNK_DAYS - 1)
+        yield max(start, stop) if stop else start, cursor
+        cursor = start - timedelta(days=1)
+
+def backfill_isin(isin, ck, today, fetch=get_history_quefondos, store=STORE_DIR):
+    """
+    Completa la serie de un ISIN. Devuelve el nº de puntos nuevos.
+    Guarda serie + checkpoint después de cada tramo (reanudable).
+    """
+    days, navs = load_series(isin, store)
+    state = ck.setdefault(isin, {})
+    before = len(days)
+
+    def commit(rows):
+        nonlocal days, navs
+        days, navs = merge(days, navs, rows)
+        save_series(isin, days, navs, store)
+        state["updated"] = today.isoformat()
+        save_checkpoint(ck, store / CHECKPOINT.name)
+
+    # 1) Hacia delante: de la última fecha guardada hasta hoy
+    if days:
+        last = date.fromordinal(days[-1])
+        if last < today:
+            for start, end in reversed(list(_ranges_back(today, last + timedelta(days=1)))):
+                commit(fetch(isin, datetime.combine(start, datetime.min.time()),
+                             datetime.combine(end, datetime.min.time())))
+
+    # 2) Hacia atrás hasta el lanzamiento del fondo (EMPTY_CHUNKS tramos vacíos seguidos)
+    if not state.get("inception"):
+        cursor = date.fromisoformat(state["back_to"]) - timedelta(days=1) if "back_to" in state else today
+        probed = 0
+        for start, end in _ranges_back(cursor):
+            rows = fetch(isin, datetime.combine(start, datetime.min.time()),
+                         datetime.combine(end, datetime.min.time()))
+            if not rows and not days:
+                # Sin serie no hay lanzamiento que marcar: puede que el fondo dejara de publicar
+                # hace tiempo, así que se sigue buscando hacia atrás; si no, se reintenta luego
+                probed += 1
+                if probed >= MAX_EMPTY_PROBE:
+                    break
+                continue
+            state["back_to"] = start.isoformat()
+            state["empty"] = 0 if rows else state.get("empty", 0) + 1
+            if state["empty"] >= EMPTY_CHUNKS:
+                state["inception"] = True
+            commit(rows)
+            if state.get("inception"):
+                break
+    return len(days) - before
+
+def main():
+    if not EXCEL_FILE.exists():
+        print(f"❌  No se encuentra '{EXCEL_FILE}'")
+        sys.exit(1)
+
+    isins = find_isins(EXCEL_FILE)
+    if not isins:
+        print("⚠  No se encontraron ISIN en la columna Notas (col Q).")
+        return
+
+    STORE_DIR.mkdir(exist_ok=True)
+    ck = load_checkpoint()
+    today = date.today()
+    print(f"\n📥  Histórico de VL → {STORE_DIR}  ({len(isins)} ISIN)\n")
+
+    failed = []
+    for isin in isins:
+        print(f"  🌐  {isin}...", end=" ", flush=True)
+        try:
+            added = backfill_isin(isin, ck, today)
+        except FetchError as e:
+            # Lo descargado hasta el fallo ya está guardado: la próxima ejecución sigue desde ahí
+            print(f"❌  {e}")
+            failed.append(isin)
+            continue
+        days, _ = load_series(isin)
+        span = (f"{date.fromordinal(days[0]):%d/%m/%Y} – {date.fromordinal(days[-1]):%d/%m/%Y}"
+                if days else "sin datos")
+        print(f"✅  +{added} puntos ({len(days)} en total, {span})")
+    HTTP.close()
+
+    if failed:
+        print(f"\n⚠   Incompletos: {', '.join(failed)}. Vuelve a ejecutar para reanudar.")
+    print()
+
+if __name__ == "__main__":
+    main()
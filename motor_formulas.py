@@ -0,0 +1,582 @@
+"""
+motor_formulas.py — Recalcula las fórmulas del Excel sin abrir Excel
+
+openpyxl con data_only=True solo ve los valores que Excel dejó cacheados; si el archivo
+lo guardó openpyxl (actualizar_precios.py) las fórmulas quedan sin valor. Este módulo
+interpreta el subconjunto de Excel que usan nuestras hojas:
+
+  • operadores + - * / ^ & % y comparaciones (= <> < > <= >=), también sobre rangos
+  • referencias A1, $A$1, rangos A1:B9 y otras hojas ('📋 ACTIVOS'!C5:C19)
+  • SUM, SUMIF, SUMPRODUCT, IF, IFERROR, INDEX, COUNT, COUNTA, MIN, MAX, AVERAGE,
+    ABS, ROUND, SQRT
+  • errores como valores (#DIV/0!, #REF!, #VALUE!, #NAME?…) que IFERROR captura
+
+Mantiene un grafo de dependencias entre celdas: solo se recalculan las fórmulas sin valor
+cacheado y las que dependen de celdas cambiadas con set(); el resto reutiliza su valor.
+
+USO:
+    eng = Engine(openpyxl.load_workbook(f), openpyxl.load_workbook(f, data_only=True))
+    eng.set("📋 ACTIVOS", "H6", 12.61)     # marca como sucias las celdas que dependen de H6
+    eng.recalc()                            # {(hoja, fila, col): valor} recalculadas
+"""
+import math, re
+from collections import defaultdict, deque
+from datetime import date, datetime
+
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
+from openpyxl.utils.datetime import to_excel
+
+class FormulaError(Exception):
+    """Fórmula que el motor no sabe interpretar (se conserva el valor cacheado)."""
+
+class XLError:
+    """Valor de error de Excel; se propaga por las operaciones como en Excel."""
+    __slots__ = ("code",)
+    def __init__(self, code):
+        self.code = code
+    def __eq__(self, other):
+        return isinstance(other, XLError) and other.code == self.code
+    def __hash__(self):
+        return hash(self.code)
+    def __repr__(self):
+        return self.code
+
+DIV0, VALUE, REF, NAME, NA = (XLError(c) for c in ("#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#N/A"))
+
+# ── Tokenizer ─────────────────────────────────────────────────────────────────
+_SHEET = r"(?:'(?:[^']|'')+'|[^\W\d][\w.]*)!"
+_CELL  = r"\$?[A-Za-z]{1,3}\$?\d+"
+_TOKEN = re.compile(rf"""
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<err>\#(?:NULL!|DIV/0!|VALUE!|REF!|NAME\?|NUM!|N/A))
+  | (?P<func>[A-Za-z_][\w.]*)(?=\()
+  | (?P<ref>(?:{_SHEET})?{_CELL}(?::{_CELL})?)
+  | (?P<badref>{_SHEET}[^\s,()+\-*/^&=<>;]*)
+  | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<bool>(?:TRUE|FALSE)\b)
+  | (?P<op><>|<=|>=|[-+*/^&=<>%(),;])
+""", re.X | re.I)
+
+def tokenize(src):
+    pos, out = 0, []
+    while pos < len(src):
+        m = _TOKEN.match(src, pos)
+        if not m:
+            raise FormulaError(f"Carácter inesperado en {src!r}: {src[pos:pos+10]!r}")
+        pos = m.end()
+        if m.lastgroup != "ws":
+            out.append((m.lastgroup, m.group(m.lastgroup)))
+    return out
+
+# ── Parser (AST en tuplas) ────────────────────────────────────────────────────
+_INFIX = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1, "&": 2,
+          "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+_UNARY, _PERCENT = 6, 7
+
+def _split_ref(text):
+    sheet = None
+    if "!" in text:
+        sheet, text = text.rsplit("!", 1)
+        sheet = sheet[1:-1].replace("''", "'") if sheet.startswith("'") else sheet
+    cells = []
+    for part in text.replace("$", "").split(":"):
+        col, row = coordinate_from_string(part.upper())
+        cells.append((row, column_index_from_string(col)))
+    return sheet, cells
+
+class _Parser:
+    def __init__(self, tokens):
+        self.toks, self.i = tokens, 0
+
+    def peek(self):
+        return self.toks[self.i] if self.i < len(self.toks) else (None, None)
+
+    def take(self, value=None):
+        kind, v = self.peek()
+        if kind is None or (value is not None and v != value):
+            raise FormulaError(f"Se esperaba {value!r} y llegó {v!r}")
+        self.i += 1
+        return kind, v
+
+    def expr(self, min_bp=0):
+        left = self.prefix()
+        while True:
+            kind, v = self.peek()
+            if kind != "op":
+                return left
+            if v == "%" and _PERCENT >= min_bp:
+                self.i += 1
+                left = ("pct", left)
+            elif v in _INFIX and _INFIX[v] > min_bp:
+                self.i += 1
+                left = ("bin", v, left, self.expr(_INFIX[v]))   # asociativo a la izquierda
+            else:
+                return left
+
+    def prefix(self):
+        kind, v = self.take()
+        if kind == "num":
+            return ("lit", float(v))
+        if kind == "str":
+            return ("lit", v[1:-1].replace('""', '"'))
+        if kind == "bool":
+            return ("lit", v.upper() == "TRUE")
+        if kind == "err":
+            return ("lit", XLError(v.upper()))
+        if kind == "badref":
+            return ("lit", REF)
+        if kind == "ref":
+            sheet, cells = _split_ref(v)
+            if len(cells) == 1:
+                return ("ref", sheet, *cells[0])
+            (r1, c1), (r2, c2) = cells
+            return ("range", sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+        if kind == "func":
+            self.take("(")
+            args = []
+            if self.peek() != ("op", ")"):
+                while True:
+                    args.append(("blank",) if self.peek()[1] in (",", ";", ")") else self.expr())
+                    if self.peek()[1] in (",", ";"):
+                        self.i += 1
+                        continue
+                    break
+            self.take(")")
+            return ("fn", v.upper(), args)
+        if kind == "op" and v == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        if kind == "op" and v in "+-":
+            node = self.expr(_UNARY)
+            return ("neg", node) if v == "-" else node
+        raise FormulaError(f"Token inesperado {v!r}")
+
+def parse(formula):
+    """'=A1+SUM(B1:B3)' → AST. Lanza FormulaError si no es interpretable."""
+    p = _Parser(tokenize(formula[1:] if formula.startswith("=") else formula))
+    node = p.expr()
+    if p.peek()[0] is not None:
+        raise FormulaError(f"Sobra {p.peek()[1]!r} en {formula!r}")
+    return node
+
+def references(node, sheet):
+    """Celdas (hoja, fila, col) de las que depende el AST."""
+    kind = node[0]
+    if kind == "ref":
+        yield (node[1] or sheet, node[2], node[3])
+    elif kind == "range":
+        s, r1, c1, r2, c2 = node[1] or sheet, *node[2:]
+        for r in range(r1, r2 + 1):
+            for c in range(c1, c2 + 1):
+                yield (s, r, c)
+    elif kind == "fn":
+        for a in node[2]:
+            yield from references(a, sheet)
+    elif kind == "bin":
+        yield from references(node[2], sheet)
+        yield from references(node[3], sheet)
+    elif kind in ("neg", "pct"):
+        yield from references(node[1], sheet)
+
+# ── Coerción y operadores ─────────────────────────────────────────────────────
+def _num(v):
+    """Valor escalar → número (o XLError) con las reglas de Excel."""
+    if isinstance(v, XLError):
+        return v
+    if v is None:
+        return 0.0
+    if isinstance(v, bool):
+        return float(v)
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, (datetime, date)):
+        return float(to_excel(v))
+    try:
+        return float(str(v).strip())
+    except ValueError:
+        return VALUE
+
+def _text(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else repr(v)
+    return str(v)
+
+def _rank(v):
+    # Orden de tipos de Excel al comparar: números < texto < lógicos
+    return 2 if isinstance(v, bool) else 1 if isinstance(v, str) else 0
+
+def _compare(op, a, b):
+    if a is None:
+        a = "" if isinstance(b, str) else False if isinstance(b, bool) else 0.0
+    if b is None:
+        b = "" if isinstance(a, str) else False if isinstance(a, bool) else 0.0
+    if isinstance(a, (datetime, date)):
+        a = _num(a)
+    if isinstance(b, (datetime, date)):
+        b = _num(b)
+    ka, kb = _rank(a), _rank(b)
+    if ka != kb:
+        a, b = ka, kb
+    elif ka == 1:
+        a, b = a.lower(), b.lower()
+    return {"=": a == b, "<>": a != b, "<": a < b, ">": a > b, "<=": a <= b, ">=": a >= b}[op]
+
+def _binary(op, a, b):
+    if isinstance(a, XLError):
+        return a
+    if isinstance(b, XLError):
+        return b
+    if op == "&":
+        return _text(a) + _text(b)
+    if op in ("=", "<>", "<", ">", "<=", ">="):
+        return _compare(op, a, b)
+    a, b = _num(a), _num(b)
+    if isinstance(a, XLError):
+        return a
+    if isinstance(b, XLError):
+        return b
+    if op == "+": return a + b
+    if op == "-": return a - b
+    if op == "*": return a * b
+    if op == "/": return a / b if b else DIV0
+    try:
+        r = a ** b
+    except (OverflowError, ZeroDivisionError):
+        return XLError("#NUM!")
+    return XLError("#NUM!") if isinstance(r, complex) else r
+
+def _map2(f, a, b):
+    """Aplica f elemento a elemento si algún operando es un rango (lista de filas)."""
+    if not (isinstance(a, list) or isinstance(b, list)):
+        return f(a, b)
+    arrays = [x for x in (a, b) if isinstance(x, list)]
+    rows, cols = max(len(x) for x in arrays), max(len(x[0]) for x in arrays)
+
+    def at(x, r, c):
+        if not isinstance(x, list):
+            return x
+        r, c = (r if len(x) > 1 else 0), (c if len(x[0]) > 1 else 0)
+        return x[r][c] if r < len(x) and c < len(x[0]) else NA
+
+    return [[f(at(a, r, c), at(b, r, c)) for c in range(cols)] for r in range(rows)]
+
+def _flat(v):
+    if isinstance(v, list):
+        for row in v:
+            yield from row
+    else:
+        yield v
+
+def _scalar(v):
+    """Rango en contexto escalar → su primera celda (como hace Excel sin fórmula matricial)."""
+    return v[0][0] if isinstance(v, list) else v
+
+# ── Funciones ─────────────────────────────────────────────────────────────────
+def _numbers(args):
+    """Números de los argumentos: en rangos se ignoran texto/vacíos/lógicos, como en Excel."""
+    for a in args:
+        if isinstance(a, list):
+            for v in _flat(a):
+                if isinstance(v, XLError):
+                    yield v
+                elif isinstance(v, (int, float)) and not isinstance(v, bool):
+                    yield float(v)
+        else:
+            yield _num(a)
+
+def _aggregate(fn):
+    def run(args):
+        vals = list(_numbers(args))
+        err = next((v for v in vals if isinstance(v, XLError)), None)
+        return err if err else fn(vals)
+    return run
+
+def _criteria(crit):
+    """Criterio de SUMIF ("RF", ">0", "<>x", 5, "Fid*") → predicado."""
+    if isinstance(crit, str):
+        m = re.match(r"(<>|<=|>=|=|<|>)?(.*)", crit, re.S)
+        op, rhs = m.group(1) or "=", m.group(2)
+        num = _num(rhs) if rhs.strip() else None
+        if isinstance(num, float):
+            return lambda v: isinstance(v, (int, float)) and not isinstance(v, bool) and _compare(op, float(v), num)
+        if op in ("=", "<>") and any(ch in rhs for ch in "*?"):
+            pat = re.compile("".join(".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in rhs), re.I | re.S)
+            match = lambda v: isinstance(v, str) and bool(pat.fullmatch(v))
+            return match if op == "=" else (lambda v: not match(v))
+        if op == "=" and rhs == "":
+            return lambda v: v is None or v == ""
+        return lambda v: _compare(op, v if v is not None else "", rhs)
+    target = _num(crit)
+    return lambda v: isinstance(v, (int, float)) and not isinstance(v, bool) and float(v) == target
+
+def _sumif(args):
+    rng, crit = args[0], _scalar(args[1])
+    sum_rng = args[2] if len(args) > 2 else rng
+    if not isinstance(rng, list):
+        rng = [[rng]]
+    if not isinstance(sum_rng, list):
+        sum_rng = [[sum_rng]]
+    ok = _criteria(crit)
+    total = 0.0
+    for r, row in enumerate(rng):
+        for c, v in enumerate(row):
+            if ok(v):
+                s = sum_rng[r][c] if r < len(sum_rng) and c < len(sum_rng[r]) else None
+                if isinstance(s, XLError):
+                    return s
+                if isinstance(s, (int, float)) and not isinstance(s, bool):
+                    total += s
+    return total
+
+def _sumproduct(args):
+    arrays = [a if isinstance(a, list) else [[a]] for a in args]
+    shape = (len(arrays[0]), len(arrays[0][0]))
+    if any((len(a), len(a[0])) != shape for a in arrays):
+        return VALUE
+    total = 0.0
+    for r in range(shape[0]):
+        for c in range(shape[1]):
+            prod = 1.0
+            for a in arrays:
+                v = a[r][c]
+                if isinstance(v, XLError):
+                    return v
+                # En SUMPRODUCT el texto cuenta como 0 (los booleanos sí se multiplican)
+                prod *= float(v) if isinstance(v, (int, float)) else 0.0
+            total += prod
+    return total
+
+def _index(args):
+    arr = args[0] if isinstance(args[0], list) else [[args[0]]]
+    r = _num(_scalar(args[1])) if len(args) > 1 and args[1] is not None else 0.0
+    c = _num(_scalar(args[2])) if len(args) > 2 and args[2] is not None else 0.0
+    for v in (r, c):
+        if isinstance(v, XLError):
+            return v
+    r, c = int(r), int(c)
+    if len(args) == 2 and len(arr) == 1:          # INDEX(fila, n) → columna n
+        r, c = 1, r
+    r, c = r or 1, c or 1
+    if not (1 <= r <= len(arr) and 1 <= c <= len(arr[0])):
+        return REF
+    return arr[r - 1][c - 1]
+
+def _round(args):
+    v, d = _num(_scalar(args[0])), _num(_scalar(args[1])) if len(args) > 1 else 0.0
+    if isinstance(v, XLError):
+        return v
+    if isinstance(d, XLError):
+        return d
+    q = 10 ** max(min(int(d), 15), -308)   # más decimales que la precisión de un float no cambian nada
+    return math.copysign(math.floor(abs(v) * q + 0.5) / q, v)   # redondeo "half away from zero"
+
+def _sqrt(args):
+    v = _num(_scalar(args[0]))
+    return v if isinstance(v, XLError) else XLError("#NUM!") if v < 0 else math.sqrt(v)
+
+def _abs(args):
+    v = _num(_scalar(args[0]))
+    return v if isinstance(v, XLError) else abs(v)
+
+FUNCTIONS = {
+    "SUM":        _aggregate(sum),
+    "MIN":        _aggregate(lambda v: min(v) if v else 0.0),
+    "MAX":        _aggregate(lambda v: max(v) if v else 0.0),
+    "AVERAGE":    _aggregate(lambda v: sum(v) / len(v) if v else DIV0),
+    "COUNT":      lambda args: float(sum(1 for a in args for v in _flat(a)
+                                         if isinstance(v, (int, float)) and not isinstance(v, bool))),
+    "COUNTA":     lambda args: float(sum(1 for a in args for v in _flat(a) if v not in (None, ""))),
+    "SUMIF":      _sumif,
+    "SUMPRODUCT": _sumproduct,
+    "INDEX":      _index,
+    "ROUND":      _round,
+    "SQRT":       _sqrt,
+    "ABS":        _abs,
+}
+
+# ── Motor ─────────────────────────────────────────────────────────────────────
+class Engine:
+    def __init__(self, wb_formulas, wb_values=None):
+        """
+        wb_formulas: workbook abierto sin data_only (fórmulas).
+        wb_values:   el mismo con data_only=True; sus valores cacheados se reutilizan.
+                     Sin él, todas las fórmulas se calculan.
+        """
+        self.sheets     = {ws.title.lower(): ws.title for ws in wb_formulas}
+        self.values     = {}                    # (hoja, fila, col) → valor
+        self.formulas   = {}                    # (hoja, fila, col) → AST
+        self.precedents = {}                    # fórmula → celdas que lee
+        self.dependents = defaultdict(set)      # celda → fórmulas que la leen
+        self.dirty      = set()
+        self.unsupported = []                   # (hoja, coordenada, motivo)
+
+        for ws in wb_formulas:
+            cached = wb_values[ws.title] if wb_values is not None and ws.title in wb_values.sheetnames else None
+            for row in ws.iter_rows():
+                for cell in row:
+                    v = cell.value
+                    text = v if isinstance(v, str) else getattr(v, "text", None)   # ArrayFormula
+                    key = (ws.title, cell.row, cell.column)
+                    if not (isinstance(text, str) and text.startswith("=")):
+                        if v is not None:
+                            self.values[key] = v
+                        continue
+                    old = cached.cell(row=cell.row, column=cell.column).value if cached is not None else None
+                    try:
+                        ast = parse(text)
+                    except FormulaError as e:
+                        self.unsupported.append((ws.title, cell.coordinate, str(e)))
+                        if old is not None:
+                            self.values[key] = old
+                        continue
+                    self._add_formula(key, ast)
+                    if old is None:
+                        self.dirty.add(key)
+                    else:
+                        self.values[key] = old
+        self._mark(list(self.dirty))
+
+    def _sheet(self, name):
+        return self.sheets.get(name.lower(), name)
+
+    def _add_formula(self, key, ast):
+        self.formulas[key] = ast
+        deps = {(self._sheet(s), r, c) for s, r, c in references(ast, key[0])}
+        self.precedents[key] = deps
+        for d in deps:
+            self.dependents[d].add(key)
+
+    def _drop_formula(self, key):
+        self.formulas.pop(key, None)
+        for d in self.precedents.pop(key, ()):
+            self.dependents[d].discard(key)
+
+    def _mark(self, keys):
+        """Marca como sucias todas las fórmulas aguas abajo de keys."""
+        queue = deque(keys)
+        while queue:
+            for dep in self.dependents.get(queue.popleft(), ()):
+                if dep not in self.dirty:
+                    self.dirty.add(dep)
+                    queue.append(dep)
+
+    # ── API ───────────────────────────────────────────────────────────────────
+    def _key(self, sheet, coord):
+        col, row = coordinate_from_string(coord.replace("$", "").upper())
+        return (self._sheet(sheet), row, column_index_from_string(col))
+
+    def set(self, sheet, coord, value):
+        """Cambia una celda (si era fórmula pasa a ser constante) y ensucia sus dependientes."""
+        key = self._key(sheet, coord)
+        if key in self.formulas:
+            self._drop_formula(key)
+            self.dirty.discard(key)
+        self.values[key] = value
+        self._mark([key])
+
+    def set_formula(self, sheet, coord, formula):
+        key = self._key(sheet, coord)
+        self._drop_formula(key)
+        self._add_formula(key, parse(formula))
+        self.dirty.add(key)
+        self._mark([key])
+
+    def get(self, sheet, coord):
+        key = self._key(sheet, coord)
+        if key in self.dirty:
+            self.recalc()
+        return self.values.get(key)
+
+    def recalc(self):
+        """
+        Evalúa las fórmulas sucias en orden topológico y devuelve {celda: valor} de las
+        recalculadas. Las que forman un ciclo valen 0 (como Excel con el aviso de circularidad).
+        """
+        dirty = self.dirty
+        indeg = {k: sum(1 for p in self.precedents[k] if p in dirty) for k in dirty}
+        queue = deque(k for k, n in indeg.items() if n == 0)
+        done = {}
+        while queue:
+            key = queue.popleft()
+            val = self._eval(self.formulas[key], key[0])
+            if isinstance(val, list):
+                val = _scalar(val)
+            self.values[key] = done[key] = val
+            for dep in self.dependents.get(key, ()):
+                if dep in indeg:
+                    indeg[dep] -= 1
+                    if indeg[dep] == 0:
+                        queue.append(dep)
+        for key in dirty - done.keys():
+            self.values[key] = done[key] = 0
+        self.dirty = set()
+        return done
+
+    # ── Evaluación ────────────────────────────────────────────────────────────
+    def _eval(self, node, sheet):
+        kind = node[0]
+        if kind == "lit":
+            return node[1]
+        if kind == "blank":
+            return None
+        if kind == "ref":
+            s = self._sheet(node[1]) if node[1] else sheet
+            if s not in self.sheets.values():
+                return REF
+            return self.values.get((s, node[2], node[3]))
+        if kind == "range":
+            s = self._sheet(node[1]) if node[1] else sheet
+            if s not in self.sheets.values():
+                return REF
+            r1, c1, r2, c2 = node[2:]
+            return [[self.values.get((s, r, c)) for c in range(c1, c2 + 1)] for r in range(r1, r2 + 1)]
+        if kind == "neg":
+            return _map2(lambda a, _: _binary("-", 0.0, a), self._eval(node[1], sheet), None)
+        if kind == "pct":
+            return _map2(lambda a, _: _binary("/", a, 100.0), self._eval(node[1], sheet), None)
+        if kind == "bin":
+            op = node[1]
+            return _map2(lambda a, b: _binary(op, a, b), self._eval(node[2], sheet), self._eval(node[3], sheet))
+        if kind == "fn":
+            name, args = node[1], node[2]
+            # IF / IFERROR: evaluación perezosa de las ramas
+            if name == "IF":
+                cond = _scalar(self._eval(args[0], sheet))
+                if isinstance(cond, XLError):
+                    return cond
+                truthy = bool(_num(cond)) if not isinstance(cond, str) else VALUE
+                if isinstance(truthy, XLError):
+                    return truthy
+                branch = args[1] if truthy else (args[2] if len(args) > 2 else ("lit", False))
+                return self._eval(branch, sheet) if branch[0] != "blank" else 0.0
+            if name == "IFERROR":
+                v = self._eval(args[0], sheet)
+                return self._eval(args[1], sheet) if isinstance(_scalar(v), XLError) else v
+            fn = FUNCTIONS.get(name)
+            if fn is None:
+                return NAME
+            try:
+                return fn([self._eval(a, sheet) for a in args])
+            except (ArithmeticError, IndexError, TypeError, ValueError):
+                # Argumentos que la función no admite (p. ej. SUMPRODUCT()): error de Excel,
+                # nunca una excepción que tumbe el recálculo de todo el libro
+                return VALUE
+        raise FormulaError(f"Nodo desconocido {kind}")
+
+def recalc_workbook(wb_values, wb_formulas):
+    """
+    Rellena en wb_values (data_only=True) el valor de las fórmulas que Excel no dejó
+    cacheadas y de las que dependen de ellas. Devuelve el Engine (eng.recalc() ya hecho)
+    y el nº de celdas escritas.
+    """
+    eng = Engine(wb_formulas, wb_values)
+    done = eng.recalc()
+    for (sheet, r, c), v in done.items():
+        wb_values[sheet].cell(row=r, column=c).value = v.code if isinstance(v, XLError) else v
+    return eng, len(done)
@@ -0,0 +1,137 @@
+"""
+muestreo.py — Series históricas multi-resolución para las gráficas (1M/6M/1Y/5Y/ALL)
+
+Cada ventana se recorta respecto a la última fecha de la serie y se reduce con
+Largest-Triangle-Three-Buckets (LTTB) a un máximo de POINT_BUDGET puntos, conservando
+picos y valles. Así el dashboard solo elige la serie ya construida en changeTF().
+"""
+import re, unicodedata
+from datetime import datetime, timedelta
+
+POINT_BUDGET = 120
+TIMEFRAMES = {"1M": 31, "6M": 183, "1Y": 366, "5Y": 1827, "ALL": None}   # días
+
+def parse_date(s):
+    """'dd/mm/yyyy' (formato del Excel) o ISO ('yyyy-mm-dd[ hh:mm:ss]')."""
+    s = str(s).strip()
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            pass
+    return None
+
+# Palabras que no distinguen un fondo de otro (casi todos empiezan por "GVC Gaesco")
+_NOISE = {"gvc", "gaesco", "clase", "fi", "fondo"}
+
+def name_key(name):
+    """'GVC Gaesco Renta Fija Flexible FI A' → 'a flexible rf': sin gestora, tildes ni puntuación."""
+    s = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    s = s.replace("renta fija", "rf").replace("renta variable", "rv")
+    words = re.sub(r"[^\w\s]", "", s).split()
+    return " ".join(sorted(w for w in words if w not in _NOISE))
+
+def match_name(name, names):
+    """
+    Nombre de `names` que corresponde a `name` (los de la hoja 📉 se abrevian a veces):
+    el mismo, o el único con la misma name_key(). None si no hay uno claro; nunca se
+    asigna por parecido, que entre fondos de la misma gestora confunde unos con otros.
+    """
+    if name in names:
+        return name
+    key = name_key(name)
+    found = [n for n in names if name_key(n) == key]
+    return found[0] if len(found) == 1 else None
+
+def lttb(points, threshold, y=lambda p: p):
+    """
+    Largest-Triangle-Three-Buckets sobre una lista ya ordenada por fecha.
+    `y` extrae el valor numérico de cada punto; el eje x es el índice (puntos equiespaciados
+    en el tiempo de muestreo). Devuelve los puntos originales seleccionados.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Media del bucket siguiente (tercer vértice del triángulo)
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end   = min(int((i + 2) * every) + 1, n)
+        span = nxt_end - nxt_start
+        avg_x = (nxt_start + nxt_end - 1) / 2
+        avg_y = sum(y(points[j]) for j in range(nxt_start, nxt_end)) / span
+
+        # Punto del bucket actual que forma el triángulo de mayor área con a y la media
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        ax, ay = a, y(points[a])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y(points[j]) - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+def timeframes(series, y, budget=POINT_BUDGET):
+    """
+    series: lista de dicts con "date"; y: función que devuelve el valor a preservar.
+    Devuelve {"1M": [...], "6M": [...], ..., "ALL": [...]} con los dicts originales.
+    Los puntos sin fecha legible o sin valor se descartan.
+    """
+    pts = [(parse_date(p.get("date")), p) for p in series]
+    pts = sorted(((d, p) for d, p in pts if d is not None and y(p) is not None), key=lambda t: t[0])
+    if not pts:
+        return {tf: [] for tf in TIMEFRAMES}
+    last = pts[-1][0]
+    out = {}
+    for tf, days in TIMEFRAMES.items():
+        if days is None:
+            window = pts
+        else:
+            start = last - timedelta(days=days)
+            i = next(k for k, (d, _) in enumerate(pts) if d >= start)
+            # Un punto anterior como ancla para que la ventana siempre dibuje una línea
+            window = pts[max(i - 1, 0):]
+        out[tf] = lttb([p for _, p in window], budget, y)
+    return out
+
+def category_history(assets, asset_history):
+    """
+    Rentabilidad acumulada por categoría en cada fecha de asset_history: media de la rt
+    de sus activos ponderada por lo invertido. En las fechas de la categoría en que un
+    activo no tiene dato (festivos de otro mercado) cuenta con su último valor; antes
+    de su primer punto no cuenta. Devuelve {cat: [{"date", "rt"}]} en el formato de
+    asset_history.
+    """
+    names = list(asset_history)
+    members = {}   # cat → [(invertido, {fecha: rt})]
+    labels = {}    # fecha → texto original
+    for a in assets:
+        key = match_name(a["name"], names)
+        rts = {}
+        for p in asset_history.get(key, []) if key else []:
+            d = parse_date(p.get("date"))
+            if p.get("rt") is None or d is None:
+                continue
+            rts[d] = p["rt"]
+            labels.setdefault(d, p["date"])
+        if rts:
+            members.setdefault(a["cat"], []).append((a["invested"], rts))
+    out = {}
+    for cat, series in members.items():
+        last = [None] * len(series)
+        for d in sorted(set().union(*(rts for _, rts in series))):
+            num = den = 0.0
+            for k, (inv, rts) in enumerate(series):
+                last[k] = rts.get(d, last[k])
+                if last[k] is not None:
+                    num += inv * last[k]
+                    den += inv
+            if den:
+                out.setdefault(cat, []).append({"date": labels[d], "rt": round(num / den, 6)})
+    return out
@@ -1,19 +1,36 @@
 #!/usr/bin/env python3
 """
 parse_excel.py — Lee cartera_real_gvc.xlsx y genera public/data.json
-USO: python parse_excel.py [ruta_excel]
+USO: python parse_excel.py [ruta_excel] [--arrow]
+     --arrow  además escribe assets/history/asset_history en arrow/ (Arrow IPC + Parquet)
 """
-import json, sys, os
+import json, sys, os, gzip
 from datetime import datetime
 
+from prerender import prerender
+from muestreo import category_history, timeframes
+from delta_json import version_id, record_version
+from atribucion import attribution_report
+from vistas import views
+from motor_formulas import recalc_workbook
+import exportar_arrow
+
 try:
     import openpyxl
 except ImportError:
     os.system(f"{sys.executable} -m pip install openpyxl -q")
     import openpyxl
 
-EXCEL_FILE  = sys.argv[1] if len(sys.argv) > 1 else "cartera_real_gvc.xlsx"
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ARGS        = [a for a in sys.argv[1:] if not a.startswith("--")]
+EXCEL_FILE  = ARGS[0] if ARGS else "cartera_real_gvc.xlsx"
+EXPORT_ARROW = "--arrow" in sys.argv[1:]
 OUTPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public", "data.json")
+VERSIONS_DIR = os.path.join(os.path.dirname(OUTPUT_FILE), "versions")
 
 SHEET_ASSETS = "📋 ACTIVOS"
 SHEET_INPUTS = "⚙️ INPUTS"
@@ -34,6 +51,16 @@ def to_pct(v, d=0.0):
 
 def to_str(v): return str(v).strip() if v is not None else ""
 
+def precompress(path):
+    """Escribe path.gz (y path.br si hay brotli) para que servidor_local.py no comprima en cada petición."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(raw, 9, mtime=0))
+    if brotli:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(raw))
+
 def parse():
     if not os.path.exists(EXCEL_FILE):
         print(f"ERROR: No se encuentra '{EXCEL_FILE}'")
@@ -41,6 +68,8 @@ def parse():
 
     print(f"Leyendo {EXCEL_FILE}...")
     wb = openpyxl.load_workbook(EXCEL_FILE, data_only=True)
+    # Fórmulas sin valor cacheado (el Excel lo guardó openpyxl, no Excel) → se recalculan aquí
+    formulas, n_recalc = recalc_workbook(wb, openpyxl.load_workbook(EXCEL_FILE))
 
     # ── Activos ────────────────────────────────────────────────────────────────
     ws_act = wb[SHEET_ASSETS]
@@ -214,6 +243,15 @@ def parse():
             "notes": "Auto-snapshot",
         })
 
+    # Series multi-resolución (1M/6M/1Y/5Y/ALL) reducidas con LTTB para las gráficas
+    history_tf = timeframes(history, lambda h: h["val"])
+    asset_history_tf = {name: timeframes(pts, lambda p: p["rt"]) for name, pts in asset_history.items()}
+    cat_history_tf = {cat: timeframes(pts, lambda p: p["rt"])
+                      for cat, pts in category_history(assets, asset_history).items()}
+
+    # Asignación / selección / interacción frente a la cartera objetivo (None sin numpy)
+    attribution = attribution_report(assets, asset_history, inputs)
+
     output = {
         "generated": datetime.now().isoformat(),
         "source":    os.path.basename(EXCEL_FILE),
@@ -222,12 +260,48 @@ def parse():
         "summary":   summary,
         "history":   history,
         "asset_history": asset_history,
+        "history_tf":    history_tf,
+        "asset_history_tf": asset_history_tf,
+        "cat_history_tf":   cat_history_tf,
+        "attribution":   attribution,
+        "views":         views(assets),
         "scenarios": [],
     }
 
+    # Versión anterior → parche JSON para los clientes que ya la tienen
+    prev = None
+    if os.path.exists(OUTPUT_FILE):
+        try:
+            with open(OUTPUT_FILE, encoding="utf-8") as f:
+                prev = json.load(f)
+        except ValueError:
+            prev = None
+    output = json.loads(json.dumps(output, default=str))
+    output["version"] = version_id(output)
+
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False, indent=2, default=str)
+    n_ops = record_version(VERSIONS_DIR, prev, output)
+
+    # KPIs + tabla de activos pintados en el HTML (primer pintado sin esperar a JS)
+    pub_dir = os.path.dirname(OUTPUT_FILE)
+    pages = sorted(n for n in os.listdir(pub_dir) if n.endswith(".html"))
+    rendered = [fn for fn in pages if prerender(os.path.join(pub_dir, fn), output)]
+
+    # Variantes precomprimidas para el servidor local (data.json + páginas)
+    for fn in ["data.json"] + pages:
+        precompress(os.path.join(pub_dir, fn))
+
+    # Arrow/Parquet para análisis: una partición por Excel (nombre del archivo)
+    arrow_msg = None
+    if EXPORT_ARROW:
+        portfolio = os.path.splitext(os.path.basename(EXCEL_FILE))[0]
+        try:
+            exportar_arrow.export(output, portfolio)
+            arrow_msg = f"{exportar_arrow.ARROW_DIR} (portfolio={portfolio})"
+        except RuntimeError as e:
+            arrow_msg = f"— {e}"
 
     s = summary
     print(f"\n✅  data.json generado: {OUTPUT_FILE}")
@@ -239,7 +313,16 @@ def parse():
     print(f"   RV:  €{s['cats']['RV']['val']:>10,.0f}  ({s['cats']['RV']['weight']*100:.1f}%)")
     print(f"   SCR: €{s['cats']['SCR']['val']:>10,.0f}  ({s['cats']['SCR']['weight']*100:.1f}%)")
     print(f"   Rf:  {inputs['rf']*100:.2f}%  |  Sharpe est: {inputs['sharpe_portfolio']:.2f}")
-    print(f"   Histórico: {len(history)} snapshots\n")
+    print(f"   Histórico: {len(history)} snapshots")
+    print(f"   Fórmulas:     {n_recalc} recalculadas"
+          f"{f', {len(formulas.unsupported)} no soportadas' if formulas.unsupported else ''}")
+    print(f"   Atribución:   {len(attribution['periods']) if attribution else '— (instala numpy)'}"
+          f"{' periodos' if attribution else ''}")
+    print(f"   Versión:      {output['version']}  ({n_ops} ops desde la anterior)")
+    print(f"   Pre-render:   {', '.join(rendered) or '—'}")
+    if arrow_msg:
+        print(f"   Arrow:        {arrow_msg}")
+    print()
 
 if __name__ == "__main__":
     parse()
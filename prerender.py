@@ -0,0 +1,137 @@
+"""
+prerender.py — Pinta en el HTML las tarjetas KPI, la cabecera y la tabla de activos
+a partir del mismo output que genera parse_excel.py, e incrusta en la página la parte
+de data.json que necesita el primer pintado (INLINE_KEYS).
+
+Así el primer pintado no espera a Chart.js ni a descargar data.json: las gráficas se
+hidratan después con el data.json completo (o su delta, ver delta_json.py). Las zonas a sustituir van delimitadas en el HTML con
+    <!-- PRERENDER:nombre --> … <!-- /PRERENDER:nombre -->
+y se pueden regenerar tantas veces como se quiera.
+"""
+import html, json, re
+
+# Solo lo que pintan cabecera, KPIs y tabla; series, atribución y vistas llegan después
+INLINE_KEYS = ("generated", "source", "version", "summary", "inputs", "assets", "views")   # views: ~1 KB
+
+CAT_NAME  = {"RF": "Renta Fija", "RV": "Renta Variable", "CR": "Criptomonedas", "SCR": "Capital Riesgo"}
+CAT_COLOR = {"RF": "#00e5a0", "RV": "#4a9eff", "CR": "#f5c518", "SCR": "#f5c518"}
+CAT_CARD  = {"RF": "green", "RV": "blue", "CR": "red", "SCR": "yellow"}
+
+# ── Formatos (idénticos a los helpers JS del dashboard) ───────────────────────
+def num_es(v, dec=0, fixed=False):
+    """Equivale a toLocaleString('es-ES'): punto de miles (no agrupa 4 cifras), coma decimal."""
+    s = f"{abs(v):,.{dec}f}"
+    ent, _, frac = s.partition(".")
+    ent = ent.replace(",", "") if len(ent.replace(",", "")) <= 4 else ent.replace(",", ".")
+    if frac and not fixed:
+        frac = frac.rstrip("0")
+    return ("-" if v < 0 and float(s.replace(",", "")) else "") + ent + ("," + frac if frac else "")
+
+def pct(v, d=2):
+    """p(v,d) en JS: '+9.53%'."""
+    return f"{'+' if v >= 0 else ''}{v*100:.{d}f}%"
+
+def fmt_eur(v):
+    """fmtEur(v) en JS: '+€14.364'."""
+    return f"{'+€' if v >= 0 else '-€'}{num_es(abs(v))}"
+
+def short_name(name, n=20):
+    return name.replace("GVC Gaesco ", "")[:n]
+
+def third_cat(cats):
+    return "CR" if cats.get("CR", {}).get("count") else "SCR"
+
+# ── Bloques ───────────────────────────────────────────────────────────────────
+def render_header(out):
+    s = out["summary"]
+    gp, rt = s["total_gp"], s["total_rt"] * 100
+    return (
+        f'\n    <div class="total-value">€{num_es(s["total_val"], 2, fixed=True)}</div>'
+        f'\n    <div class="total-gain">{"▲ +€" if gp >= 0 else "▼ -€"}{num_es(abs(gp), 2)}'
+        f' · {"+" if rt >= 0 else ""}{rt:.2f}% total</div>'
+        f'\n    <div class="date-badge">Actualizado: {html.escape(s.get("updated_at", ""))}</div>\n    '
+    )
+
+def _card(color, label, value, sub, sub_cls="", value_id=""):
+    vid = f' id="{value_id}"' if value_id else ""
+    cls = f"kpi-sub {sub_cls}".strip()
+    return (f'\n    <div class="kpi-card {color}">'
+            f'\n      <div class="kpi-label">{label}</div>'
+            f'\n      <div class="kpi-value"{vid}>{value}</div>'
+            f'\n      <div class="{cls}">{sub}</div>'
+            f'\n    </div>')
+
+def render_kpis(out):
+    s, cats = out["summary"], out["summary"]["cats"]
+    pos = lambda v: "pos" if v >= 0 else "neg"
+    cards = [
+        _card("blue", "Valor Total Cartera", f'€{num_es(s["total_val"])}',
+              f'<span id="kpiRT">{pct(s["total_rt"])}</span> sobre coste', pos(s["total_rt"]), "kpiTotalVal"),
+        _card("green", "Ganancia Neta", fmt_eur(s["total_gp"]), "Plusvalía no realizada", "", "kpiGP"),
+    ]
+    for code in ("RF", "RV", third_cat(cats)):
+        c = cats.get(code, {})
+        rt, w = c.get("rt", 0), c.get("weight", 0)
+        key = "CR" if code in ("CR", "SCR") else code
+        cards.append(_card(CAT_CARD[code], CAT_NAME[code], f'€{num_es(c.get("val", 0))}',
+                           f'<span id="kpi{key}Ret">{pct(rt)}</span> · <span id="kpi{key}W">{w*100:.1f}%</span> cartera',
+                           pos(rt), f"kpi{key}Val"))
+    best, worst = s["best_asset"], s["worst_asset"]
+    cards.append(_card("yellow", "Mejor Activo", f'{"+" if best["rt"] >= 0 else ""}{best["rt"]*100:.1f}%',
+                       f'<span id="kpiBestName">{html.escape(short_name(best["name"]))}</span>', "", "kpiBestVal"))
+    cards.append(_card("red", "Peor Activo", f'{worst["rt"]*100:.1f}%',
+                       f'<span id="kpiWorstName">{html.escape(short_name(worst["name"]))}</span>', pos(worst["rt"]), "kpiWorstVal"))
+    return "".join(cards) + "\n  "
+
+def render_assets(out):
+    total_val = out["summary"]["total_val"] or 1
+    rows = []
+    for a in out["assets"]:
+        w = a["val"] / total_val * 100
+        is_p = "pos" if a["gp"] >= 0 else "neg"
+        rows.append(f"""
+    <tr>
+      <td><span class="asset-name">{html.escape(a["name"])}</span></td>
+      <td><span class="category-badge cat-{a["cat"].lower()}">{CAT_NAME.get(a["cat"], a["cat"])}</span></td>
+      <td><span class="num-cell">€{num_es(a["invested"])}</span></td>
+      <td><span class="num-cell">€{num_es(a["val"])}</span></td>
+      <td><span class="num-cell {is_p}">{fmt_eur(a["gp"])}</span></td>
+      <td><span class="num-cell {is_p}">{pct(a["rt"])}</span></td>
+      <td><span class="num-cell {"pos" if a["ytd"] >= 0 else "neg"}">{pct(a["ytd"])}</span></td>
+      <td><span class="num-cell {"pos" if a["mtd"] >= 0 else "neg"}">{pct(a["mtd"])}</span></td>
+      <td style="min-width:100px">
+        <span class="num-cell" style="font-size:0.9rem">{w:.1f}%</span>
+        <div class="mini-bar"><div class="mini-bar-fill" style="width:{min(round(w, 1)*3, 100):g}%;background:{CAT_COLOR.get(a["cat"], "#6b7a8d")}"></div></div>
+      </td>
+    </tr>""")
+    return "".join(rows)
+
+def render_data(out):
+    core = {k: out[k] for k in INLINE_KEYS if k in out}
+    # "</" escapado para que el JSON no pueda cerrar la etiqueta <script>
+    raw = json.dumps(core, ensure_ascii=False, separators=(",", ":"), default=str).replace("</", "<\\/")
+    return f'\n<script id="portfolioData" type="application/json">{raw}</script>\n'
+
+BLOCKS = {
+    "header":     render_header,
+    "kpis":       render_kpis,
+    "assetcount": lambda out: f'{len(out["assets"])} activos',
+    "assets":     render_assets,
+    "data":       render_data,
+}
+
+def prerender(html_path, out):
+    """Sustituye los bloques PRERENDER de html_path. Devuelve True si había alguno."""
+    with open(html_path, encoding="utf-8") as f:
+        page = f.read()
+    found = False
+    for name, render in BLOCKS.items():
+        pat = re.compile(rf"(<!-- PRERENDER:{name} -->)(.*?)(<!-- /PRERENDER:{name} -->)", re.S)
+        if pat.search(page):
+            found = True
+            content = render(out)
+            page = pat.sub(lambda m: m.group(1) + content + m.group(3), page)
+    if found:
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(page)
+    return found
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+programador.py
+==============
+Modo programado de actualizar_precios.py: proceso de larga duración que consulta cada
+fondo solo cuando toca que haya publicado un nuevo valor liquidativo (VL).
+
+USO:
+    python programador.py                                # cartera_real_gvc.xlsx
+    python programador.py mi_cartera.xlsx --festivos festivos.txt
+    python programador.py --once                         # una ronda y termina (cron)
+
+  • Aprende la hora habitual de publicación de cada fondo y proveedor a partir de las
+    consultas anteriores (programador_estado.json) y empieza a consultar un poco antes;
+    un VL que aparece tras una consulta sin novedad el mismo día fija la hora, y uno que
+    ya estaba en la primera consulta solo la acota por arriba
+  • Los ISIN pendientes se agrupan en una sola ronda de consultas
+  • Sin consultas en fin de semana ni festivos: TARGET para todos y los nacionales del
+    país del ISIN. Un archivo los ajusta: una fecha por línea, "AAAA-MM-DD" o "MM-DD"
+    para todos los años; con "-" delante ("-12-08") la fecha deja de ser festiva
+  • Solo guarda el Excel y regenera data.json (parse_excel.py) si algún precio cambió
+"""
+import json, os, statistics, subprocess, sys, time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import openpyxl
+
+from actualizar_precios import HTTP, fetch_prices, find_rows, print_summary, write_prices
+
+HERE          = Path(__file__).resolve().parent
+STATE_FILE    = HERE / "programador_estado.json"
+DEFAULT_PUB   = 10 * 60      # minuto del día en que se espera el VL sin historial (10:00)
+EARLY         = 30           # se empieza a consultar estos minutos antes de lo aprendido
+POLL_EVERY    = 30           # minutos entre reintentos mientras el VL del día no aparece
+CUTOFF        = 21 * 60      # a partir de aquí no se consulta hasta el siguiente día hábil
+MAX_OBS       = 20           # observaciones por fondo/proveedor que se recuerdan
+
+# ── Calendario ────────────────────────────────────────────────────────────────
+def _easter(y):
+    """Domingo de Pascua (algoritmo de Meeus/Jones/Butcher)."""
+    a, b, c = y % 19, y // 100, y % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(y, month, day + 1)
+
+class Calendar:
+    """
+    Días hábiles: lunes a viernes salvo festivos TARGET, los nacionales del país (dos
+    primeras letras del ISIN) y los que añada o quite el archivo.
+    """
+    TARGET   = ["01-01", "05-01", "12-25", "12-26"]          # + Viernes Santo y Lunes de Pascua
+    NATIONAL = {"ES": ["01-06", "08-15", "10-12", "11-01", "12-06", "12-08"]}
+
+    def __init__(self, path=None):
+        self.added, self.removed = set(), set()     # "MM-DD" (todos los años) o date
+        if path:
+            for line in Path(path).read_text(encoding="utf-8").splitlines():
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                target = self.removed if line.startswith("-") else self.added
+                line = line[1:] if line.startswith("-") else line
+                target.add(line if len(line) == 5 else date.fromisoformat(line))
+
+    def is_holiday(self, d, country=None):
+        md = d.strftime("%m-%d")
+        if d in self.removed or md in self.removed:
+            return False
+        if d in self.added or md in self.added or md in self.TARGET or md in self.NATIONAL.get(country, ()):
+            return True
+        easter = _easter(d.year)
+        return d in (easter - timedelta(days=2), easter + timedelta(days=1))   # Viernes Santo, Lunes de Pascua
+
+    def is_business_day(self, d, country=None):
+        return d.weekday() < 5 and not self.is_holiday(d, country)
+
+    def next_business_day(self, d, country=None):
+        d += timedelta(days=1)
+        while not self.is_business_day(d, country):
+            d += timedelta(days=1)
+        return d
+
+# ── Estado aprendido ──────────────────────────────────────────────────────────
+# {isin: {"provider", "price", "nav_date", "last_new": "AAAA-MM-DD", "last_poll": iso,
+#         "last_miss": iso, "obs": {proveedor: [minuto del día, …]}}}
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state, path=STATE_FILE):
+    tmp = Path(str(path) + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _minute(dt):
+    return dt.hour * 60 + dt.minute
+
+def publication_minute(st):
+    """Hora esperada de publicación (minuto del día) para el proveedor actual del fondo."""
+    obs = st.get("obs", {}).get(st.get("provider", "quefondos"), [])
+    return int(statistics.median(obs)) if obs else DEFAULT_PUB
+
+def next_poll(st, now, cal, country=None):
+    """Momento a partir del cual el fondo vuelve a estar pendiente (country: calendario del ISIN)."""
+    today = now.date()
+    start = max(publication_minute(st) - EARLY, 0)
+    seen_today = st.get("last_new") == today.isoformat()
+    if cal.is_business_day(today, country) and not seen_today and _minute(now) < CUTOFF:
+        at = datetime.combine(today, datetime.min.time()) + timedelta(minutes=start)
+        if st.get("last_poll"):
+            at = max(at, datetime.fromisoformat(st["last_poll"]) + timedelta(minutes=POLL_EVERY))
+        return at
+    nxt = cal.next_business_day(today, country)
+    return datetime.combine(nxt, datetime.min.time()) + timedelta(minutes=start)
+
+def record(state, isin, result, now):
+    """
+    Anota una consulta. result = (precio, fecha, proveedor) o None si no respondió.
+    Devuelve (VL nuevo, precio distinto del guardado).
+    """
+    st = state.setdefault(isin, {})
+    prev_poll = st.get("last_poll")
+    st["last_poll"] = now.isoformat(timespec="seconds")
+    if result is None:
+        st["last_miss"] = st["last_poll"]
+        return False, False
+    price, nav_date, provider = result
+    known = "nav_date" in st
+    price_changed = price != st.get("price")
+    if not price_changed and known and nav_date == st["nav_date"]:
+        st["last_miss"] = st["last_poll"]
+        return False, False
+    miss = st.get("last_miss")
+    if known and miss and miss == prev_poll and datetime.fromisoformat(miss).date() == now.date():
+        # El VL apareció entre la consulta sin novedad de hoy y ahora: se anota el punto medio
+        miss = datetime.fromisoformat(miss)
+        obs = st.setdefault("obs", {}).setdefault(provider, [])
+        obs.append(_minute(miss + (now - miss) / 2))
+        del obs[:-MAX_OBS]
+    elif known:
+        # Ya estaba publicado en la primera consulta: solo se sabe que salió antes de ahora.
+        # Las observaciones posteriores se rebajan a esta cota; así la hora puede adelantarse
+        # pero nunca por debajo de la real, porque ahí vuelven los fallos y el punto medio.
+        obs = st.get("obs", {}).get(provider, [])
+        bound = _minute(now)
+        if bound < (int(statistics.median(obs)) if obs else DEFAULT_PUB):
+            st.setdefault("obs", {})[provider] = [min(o, bound) for o in obs] or [bound]
+    st.update(price=price, nav_date=nav_date, provider=provider, last_new=now.date().isoformat())
+    return True, price_changed
+
+# ── Rondas ────────────────────────────────────────────────────────────────────
+def run_round(excel_file, state, cal, now=None, fetch=fetch_prices, regenerate=True):
+    """Consulta los ISIN pendientes en una sola ronda. Devuelve los que cambiaron."""
+    now = now or datetime.now()
+    wb = openpyxl.load_workbook(excel_file)
+    ws = wb["📋 ACTIVOS"]
+    found = find_rows(ws)
+    for row, isin in found.items():
+        # Sin historial, el precio de referencia es el que ya tiene el Excel (col H)
+        px = ws.cell(row=row, column=8).value
+        if isinstance(px, (int, float)):
+            state.setdefault(isin, {}).setdefault("price", px)
+    due = sorted(isin for isin in set(found.values())
+                 if next_poll(state.get(isin, {}), now, cal, isin[:2]) <= now)
+    if not due:
+        return []
+
+    print(f"\n🕑  {now:%d/%m/%Y %H:%M} — {len(due)} fondo(s) pendiente(s)")
+    updates = fetch(due, pause=0.2)
+    changed = [isin for isin in due if record(state, isin, updates.get(isin), now)[1]]
+    save_state(state)
+
+    if not changed:
+        print("    Sin cambios de precio.")
+        return []
+    updated_rows, totals = write_prices(wb, found, {i: updates[i] for i in changed})
+    wb.save(excel_file)
+    print_summary(updated_rows, totals)
+    if regenerate:
+        subprocess.run([sys.executable, str(HERE / "parse_excel.py"), str(excel_file)], check=False)
+    return changed
+
+def sleep_until(state, isins, cal, now):
+    wake = min((next_poll(state.get(i, {}), now, cal, i[:2]) for i in isins), default=now + timedelta(hours=1))
+    secs = min(max((wake - now).total_seconds(), 30), 3600)
+    print(f"💤  Próxima consulta: {now + timedelta(seconds=secs):%d/%m %H:%M}")
+    time.sleep(secs)
+
+def main(argv):
+    args = [a for a in argv if not a.startswith("--")]
+    once = "--once" in argv
+    holidays = None
+    if "--festivos" in argv:
+        i = argv.index("--festivos") + 1
+        if i >= len(argv) or argv[i].startswith("--"):
+            print("❌  Falta el archivo de festivos: --festivos festivos.txt")
+            sys.exit(1)
+        holidays = argv[i]
+        args.remove(holidays)
+        if not Path(holidays).exists():
+            print(f"❌  No se encuentra '{holidays}'")
+            sys.exit(1)
+    excel_file = Path(args[0]) if args else Path("cartera_real_gvc.xlsx")
+    if not excel_file.exists():
+        print(f"❌  No se encuentra '{excel_file}'")
+        sys.exit(1)
+
+    cal = Calendar(holidays)
+    state = load_state()
+    isins = sorted(set(find_rows(openpyxl.load_workbook(excel_file)["📋 ACTIVOS"]).values()))
+    print(f"📅  Programador de precios: {excel_file}  ({len(isins)} fondos con ISIN)")
+    try:
+        while True:
+            run_round(excel_file, state, cal)
+            if once:
+                break
+            sleep_until(state, isins, cal, datetime.now())
+    except KeyboardInterrupt:
+        print("\n👋  Programador detenido.")
+    finally:
+        HTTP.close()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
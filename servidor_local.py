@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+servidor_local.py — Sirve public/ en local (sin internet, solo librería estándar)
+USO: python servidor_local.py [puerto]          (por defecto 8000)
+
+  • Respuestas precomprimidas: usa los .br / .gz que genera parse_excel.py
+    (si faltan o están desfasados, comprime en memoria una sola vez)
+  • ETag fuerte = hash SHA-256 del contenido → 304 Not Modified al revalidar
+  • / → indexa.html, el dashboard que lee data.json (index.html, el que carga el Excel
+    en el navegador, sigue en /index.html)
+  • /api/delta?since=<versión> → parche JSON desde la versión del cliente hasta la
+    última (o el payload completo si la cadena es demasiado larga), a partir de una
+    copia en memoria de data.json
+"""
+import asyncio, gzip, hashlib, json, mimetypes, os, sys
+from urllib.parse import parse_qs, unquote
+
+from delta_json import delta_since
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public")
+DATA_FILE  = os.path.join(PUBLIC_DIR, "data.json")
+VERSIONS_DIR = os.path.join(PUBLIC_DIR, "versions")
+HOST       = "127.0.0.1"
+PORT       = 8000
+HOME_PAGE  = "indexa.html"
+
+COMPRESSIBLE = (".html", ".json", ".js", ".css", ".svg", ".txt")
+ENCODINGS    = (("br", ".br"), ("gzip", ".gz"))   # orden de preferencia
+
+STATUS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+          405: "Method Not Allowed", 500: "Internal Server Error"}
+
+# ── Caché de representaciones ─────────────────────────────────────────────────
+class Resource:
+    """Contenido de un fichero + sus variantes comprimidas, con ETag por variante."""
+    def __init__(self, body, ctype, mtime):
+        self.mtime    = mtime
+        self.ctype    = ctype
+        self.digest   = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {"identity": body}
+
+    def etag(self, enc):
+        # Cada codificación es una representación distinta → ETag distinto
+        return f'"{self.digest}"' if enc == "identity" else f'"{self.digest}-{enc}"'
+
+_cache = {}
+
+def _load_variants(res, path, compress):
+    for enc, ext in ENCODINGS:
+        pre = path + ext if path else None
+        if pre and os.path.exists(pre) and os.path.getmtime(pre) >= res.mtime:
+            with open(pre, "rb") as f:
+                res.variants[enc] = f.read()
+        elif compress and enc == "gzip":
+            res.variants[enc] = gzip.compress(res.variants["identity"], 9, mtime=0)
+        elif compress and enc == "br" and brotli:
+            res.variants[enc] = brotli.compress(res.variants["identity"])
+
+def get_resource(path):
+    """Devuelve el Resource de `path`, recargándolo solo si cambió en disco."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    res = _cache.get(path)
+    if res is None or res.mtime != mtime:
+        with open(path, "rb") as f:
+            body = f.read()
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if ctype.startswith("text/") or ctype in ("application/json", "application/javascript"):
+            ctype += "; charset=utf-8"
+        res = Resource(body, ctype, mtime)
+        _load_variants(res, path, path.endswith(COMPRESSIBLE))
+        _cache[path] = res
+    return res
+
+# ── /api/delta ────────────────────────────────────────────────────────────────
+_data   = {"mtime": None, "data": None}
+_deltas = {}   # (mtime de data.json, since | None si va completo) → Resource
+
+def load_data():
+    """data.json en memoria, releído solo cuando cambia en disco (None si no existe)."""
+    try:
+        mtime = os.path.getmtime(DATA_FILE)
+    except OSError:
+        return None
+    if _data["mtime"] != mtime:
+        with open(DATA_FILE, encoding="utf-8") as f:
+            _data.update(mtime=mtime, data=json.load(f))
+        _deltas.clear()
+    return _data["data"]
+
+def get_delta(since):
+    """Operaciones desde `since`; payload completo si no hay cadena o sale más grande."""
+    data = load_data()
+    if data is None:
+        return None
+    mtime = _data["mtime"]
+    latest = data.get("version")
+    ops = [] if since == latest else delta_since(VERSIONS_DIR, since)
+    key = (mtime, since if ops is not None else None)
+    if key not in _deltas:
+        full = json.dumps({"version": latest, "full": data}, ensure_ascii=False, separators=(",", ":"))
+        body = full
+        if ops is not None:
+            patch = json.dumps({"version": latest, "patch": ops}, ensure_ascii=False, separators=(",", ":"))
+            body = patch if len(patch) < len(full) else full
+        res = Resource(body.encode("utf-8"), "application/json; charset=utf-8", mtime)
+        _load_variants(res, None, True)
+        _deltas[key] = res
+    return _deltas[key]
+
+# ── Negociación HTTP ──────────────────────────────────────────────────────────
+def pick_encoding(res, accept):
+    """Elige br/gzip/identity según Accept-Encoding (respeta q=0)."""
+    accepted = {}
+    for part in accept.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try: q = float(params.strip()[2:])
+            except ValueError: q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for enc, _ in ENCODINGS:
+        if enc in res.variants and accepted.get(enc, accepted.get("*", 0)) > 0:
+            return enc
+    return "identity"
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: W/"x" equivale a "x"
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+def resolve(url_path):
+    """Traduce la ruta URL a un fichero dentro de public/ (sin escapar del directorio)."""
+    rel = unquote(url_path.split("?", 1)[0].split("#", 1)[0])
+    if rel in ("", "/"):
+        rel = "/" + HOME_PAGE
+    full = os.path.normpath(os.path.join(PUBLIC_DIR, rel.lstrip("/")))
+    if not full.startswith(PUBLIC_DIR + os.sep) or not os.path.isfile(full):
+        return None
+    return full
+
+# ── Conexión ──────────────────────────────────────────────────────────────────
+async def send(writer, status, headers=(), body=b"", head=False):
+    lines = [f"HTTP/1.1 {status} {STATUS[status]}",
+             f"Date: {format_datetime(datetime.now(timezone.utc), usegmt=True)}",
+             "Server: portfolio-local"]
+    lines += [f"{k}: {v}" for k, v in headers]
+    if status != 304:   # un 304 no lleva cuerpo: su Content-Length sería el de la representación
+        lines.append(f"Content-Length: {len(body)}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    if body and not head:
+        writer.write(body)
+    await writer.drain()
+
+async def respond(writer, method, res, req_headers):
+    head = method == "HEAD"
+    enc  = pick_encoding(res, req_headers.get("accept-encoding", ""))
+    etag = res.etag(enc)
+    headers = [("ETag", etag), ("Cache-Control", "no-cache"), ("Vary", "Accept-Encoding")]
+    if etag_matches(req_headers.get("if-none-match"), etag):
+        await send(writer, 304, headers, head=True)
+        return 304
+    headers.append(("Content-Type", res.ctype))
+    if enc != "identity":
+        headers.append(("Content-Encoding", enc))
+    await send(writer, 200, headers, res.variants[enc], head)
+    return 200
+
+async def handle(reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                await send(writer, 400, [("Connection", "close")])
+                break
+            req_headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = h.decode("latin-1").partition(":")
+                req_headers[k.strip().lower()] = v.strip()
+
+            conn = req_headers.get("connection", "").lower()
+            keep = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+            if method not in ("GET", "HEAD"):
+                # El cuerpo (Content-Length o chunked) no se lee: se cierra la conexión para
+                # que sus bytes no se interpreten como la siguiente petición
+                await send(writer, 405, [("Allow", "GET, HEAD"), ("Connection", "close")])
+                print(f"  {method} {target} → 405")
+                break
+
+            route, _, query = target.partition("?")
+            if route == "/api/delta":
+                res = get_delta(parse_qs(query).get("since", [""])[0])
+            else:
+                path = resolve(target)
+                res  = get_resource(path) if path else None
+            if res is None:
+                await send(writer, 404)
+                status = 404
+            else:
+                status = await respond(writer, method, res, req_headers)
+            print(f"  {method} {target} → {status}")
+            if not keep:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except Exception as e:
+        print(f"    ⚠  Error atendiendo petición: {e}")
+        try: await send(writer, 500, [("Connection", "close")])
+        except ConnectionError: pass
+    finally:
+        writer.close()
+
+async def main(port=PORT):
+    server = await asyncio.start_server(handle, HOST, port)
+    print(f"\n🌐  Dashboard local en http://{HOST}:{port}/  (Ctrl+C para salir)")
+    print(f"    Sirviendo: {PUBLIC_DIR}")
+    if brotli is None:
+        print("    (brotli no instalado: se usará gzip salvo que existan los .br)")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    try:
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    except ValueError:
+        sys.exit(f"USO: python {os.path.basename(__file__)} [puerto]   ('{sys.argv[1]}' no es un puerto)")
+    try:
+        asyncio.run(main(port))
+    except KeyboardInterrupt:
+        print("\n👋  Servidor detenido.")
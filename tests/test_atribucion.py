@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from atribucion import attribution, attribution_report
+
+NOW = datetime(2026, 10, 19)
+START = NOW - timedelta(days=1500)
+ASSETS = [{"name": f"Fondo {i}", "cat": c, "invested": 1000.0, "val": 1100.0, "rt": 0.1,
+           "fecha_inicio": START.strftime("%d/%m/%Y")} for i, c in enumerate(("RF", "RV", "RV", "CR"))]
+HISTORY = {a["name"]: [{"date": (START + timedelta(days=k)).strftime("%d/%m/%Y"), "rt": 0.0001 * k * (i + 1)}
+                       for k in range(1, 1500)] for i, a in enumerate(ASSETS)}
+INPUTS = {"target_return": 0.06, "target_weight_rf": 0.4, "target_weight_rv": 0.6}
+
+
+def test_daily_history_gives_bounded_default_periods():
+    periods = attribution_report(ASSETS, HISTORY, INPUTS, now=NOW)["periods"]
+    assert [(p["label"], p["start"]) for p in periods] == [
+        ("Inicio", "inicio"), ("YTD", "31/12/2025"), ("1A", "19/10/2025"),
+        ("3A", "20/10/2023"), ("Histórico", (START + timedelta(days=1)).strftime("%d/%m/%Y")),
+    ]
+    assert all(p["end"] == "19/10/2026" for p in periods)
+
+
+def test_sparse_history_skips_duplicate_starts():
+    sparse = {n: pts[::400] for n, pts in HISTORY.items()}   # 4 fechas
+    periods = attribution(ASSETS, sparse, INPUTS, now=NOW)
+    starts = [p["start"] for p in periods]
+    assert len(starts) == len(set(starts))
+    assert periods[0]["label"] == "Inicio"
+
+
+def test_far_start_is_labelled_by_dates():
+    # Última fecha anterior al 1/1 es de junio: no es un "YTD" (ni un "1A")
+    hist = {a["name"]: [{"date": "20/06/2025", "rt": 0.01}, {"date": "01/03/2026", "rt": 0.02}] for a in ASSETS}
+    periods = attribution(ASSETS, hist, INPUTS, now=NOW)
+    assert [(p["label"], p["start"]) for p in periods] == [("Inicio", "inicio"), (None, "20/06/2025")]
+
+
+def test_explicit_pairs():
+    periods = attribution(ASSETS, HISTORY, INPUTS, pairs=[(100, 400), (1, 2)], now=NOW)
+    assert [(p["label"], p["days"]) for p in periods] == [(None, 300), (None, 1)]
+
+
+def test_effects_add_up_to_active_return():
+    for p in attribution_report(ASSETS, HISTORY, INPUTS, now=NOW)["periods"]:
+        total = p["allocation"] + p["selection"] + p["interaction"]
+        assert total == pytest.approx(p["portfolio"] - p["benchmark"], abs=1e-5)
+        assert p["active"] == pytest.approx(p["portfolio"] - p["benchmark"], abs=1e-6)
+        for c in p["categories"].values():
+            assert c["allocation"] == pytest.approx((c["w_p"] - c["w_b"]) * (c["r_b"] - p["benchmark"]), abs=1e-5)
+        # El reparto por activo suma lo mismo que el de las categorías con posiciones
+        by_asset = sum(a["allocation"] + a["selection"] + a["interaction"] for a in p["assets"])
+        held = [c for c in p["categories"].values() if c["w_p"]]
+        assert by_asset == pytest.approx(sum(c["allocation"] + c["selection"] + c["interaction"] for c in held), abs=1e-5)
+
+
+def test_two_categories_by_hand():
+    # 600 € en RF (+2 %) y 400 € en RV (+10 %) durante 365 días; objetivo 50/50 al 3 % / 8 % anual
+    assets = [{"name": "Bono", "cat": "RF", "invested": 600.0, "val": 612.0, "rt": 0.02, "fecha_inicio": "01/01/2025"},
+              {"name": "Bolsa", "cat": "RV", "invested": 400.0, "val": 440.0, "rt": 0.10, "fecha_inicio": "01/01/2025"}]
+    hist = {"Bono": [{"date": "01/06/2025", "rt": 0.0}], "Bolsa": [{"date": "01/06/2025", "rt": 0.0}]}
+    inputs = {"target_return": 0.05, "target_weight_rf": 0.5, "target_weight_rv": 0.5,
+              "exp_ret_rf": 0.03, "exp_ret_rv": 0.08}
+    (p,) = attribution(assets, hist, inputs, pairs=[(1, 2)], now=datetime(2026, 6, 1))
+
+    rb_rf, rb_rv = 1.03 ** (365 / 365.25) - 1, 1.08 ** (365 / 365.25) - 1   # 0.029975…, 0.079932…
+    Rb = 0.5 * rb_rf + 0.5 * rb_rv
+    assert p["days"] == 365
+    assert p["portfolio"] == pytest.approx(0.6 * 0.02 + 0.4 * 0.10)          # 0.052
+    assert p["benchmark"] == pytest.approx(Rb, abs=1e-6)
+    rf, rv = p["categories"]["RF"], p["categories"]["RV"]
+    assert (rf["w_p"], rv["w_p"], rf["w_b"], rv["w_b"]) == (0.6, 0.4, 0.5, 0.5)
+    assert rf["allocation"] == pytest.approx(0.1 * (rb_rf - Rb), abs=1e-6)    # −0.0024979
+    assert rv["allocation"] == pytest.approx(-0.1 * (rb_rv - Rb), abs=1e-6)   # −0.0024979
+    assert rf["selection"] == pytest.approx(0.5 * (0.02 - rb_rf), abs=1e-6)   # −0.0049876
+    assert rv["selection"] == pytest.approx(0.5 * (0.10 - rb_rv), abs=1e-6)   # +0.0100341
+    assert rf["interaction"] == pytest.approx(0.1 * (0.02 - rb_rf), abs=1e-6)
+    assert rv["interaction"] == pytest.approx(-0.1 * (0.10 - rb_rv), abs=1e-6)
+    assert p["allocation"] + p["selection"] + p["interaction"] == pytest.approx(p["active"], abs=1e-5)
+    assert [a["name"] for a in p["assets"]] == ["Bolsa", "Bono"]
@@ -0,0 +1,130 @@
+import gzip
+import random
+import re
+import string
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cliente_http import DRAIN_MAX, CircuitOpenError, Client, FetchError
+
+MARK = "<span class='vl'>12,345678</span>"
+_rnd = random.Random(0)
+NOISE = "".join(_rnd.choice(string.ascii_letters) for _ in range(400_000))   # apenas comprimible
+
+PAGES = {
+    "/": ("<p>ok</p>", {}),
+    "/big": (f"<html>{MARK}{NOISE}</html>", {}),                                    # 400 KB tras la marca
+    "/tail": (f"<html>{MARK}{NOISE[:DRAIN_MAX // 2]}</html>", {}),                 # resto pequeño
+    "/gzip": (f"<html>{'<td>1,0</td>' * 20000}{MARK}{'x' * 300_000}</html>", {"gzip": True}),
+    "/latin": ("<p>Japón</p>", {"charset": "x-desconocido"}),
+    "/close": ("<p>adiós</p>", {"close": True}),   # cierra sin avisar (sin Connection: close)
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.peers.add(self.client_address)
+        status = {"/missing": 404, "/down": 503}.get(self.path, 200)
+        text, opts = PAGES.get(self.path, ("", {}))
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"text/html; charset={opts.get('charset', 'utf-8')}")
+        if opts.get("gzip") and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True     # el cliente cortó tras casar los patrones
+        if opts.get("close"):
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass                                 # conexiones que el cliente corta a propósito
+
+
+@pytest.fixture
+def server():
+    srv = _Server(("127.0.0.1", 0), _Handler)
+    srv.peers = set()                        # (ip, puerto) de cada conexión TCP abierta
+    srv.base = f"http://127.0.0.1:{srv.server_port}"
+    threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+    yield srv
+    srv.shutdown()
+
+
+@pytest.fixture
+def http():
+    c = Client(retries=0, backoff=0)
+    yield c
+    c.close()
+
+
+def test_keep_alive_reuses_one_connection(server, http):
+    for _ in range(3):
+        assert http.fetch(server.base + "/") == "<p>ok</p>"
+    assert len(server.peers) == 1
+
+
+def test_gzip_is_decoded(server, http):
+    assert http.fetch(server.base + "/gzip") == PAGES["/gzip"][0]
+
+
+def test_until_stops_early(server, http):
+    text = http.fetch(server.base + "/big", until=[re.compile(r"class='vl'>([\d,]+)<")])
+    assert MARK in text
+    assert len(text) < 100_000
+
+
+def test_large_unread_tail_closes_the_connection(server, http):
+    until = [re.compile(r"class='vl'")]
+    for _ in range(2):
+        http.fetch(server.base + "/big", until=until)
+    assert len(server.peers) == 2
+
+
+def test_small_unread_tail_is_drained_and_reused(server, http):
+    until = [re.compile(r"class='vl'")]
+    for path in ("/tail", "/gzip", "/tail", "/gzip"):
+        assert MARK in http.fetch(server.base + path, until=until)
+    assert len(server.peers) == 1
+
+
+def test_stale_pooled_connection_reconnects(server, http):
+    assert http.fetch(server.base + "/close") == "<p>adiós</p>"
+    assert http.fetch(server.base + "/") == "<p>ok</p>"   # la del pool ya está cerrada
+    assert len(server.peers) == 2
+
+
+def test_unknown_charset_falls_back_to_utf8(server, http):
+    assert http.fetch(server.base + "/latin") == "<p>Japón</p>"
+
+
+def test_4xx_does_not_open_breaker(server):
+    http = Client(retries=0, breaker_threshold=2)
+    for _ in range(5):
+        with pytest.raises(FetchError) as e:
+            http.fetch(server.base + "/missing", provider="p")
+        assert not isinstance(e.value, CircuitOpenError)
+    assert http.breaker("p").failures == 0
+    assert http.fetch(server.base + "/", provider="p") == "<p>ok</p>"
+
+
+def test_5xx_opens_breaker(server):
+    http = Client(retries=0, backoff=0, breaker_threshold=2)
+    for _ in range(2):
+        with pytest.raises(FetchError):
+            http.fetch(server.base + "/down", provider="p")
+    with pytest.raises(CircuitOpenError):
+        http.fetch(server.base + "/", provider="p")
@@ -0,0 +1,136 @@
+"""Ida y vuelta de los parches JSON de delta_json.py: apply_patch(a, make_patch(a, b)) == b."""
+import json, random
+
+import pytest
+
+from delta_json import apply_patch, delta_since, make_patch, record_version, version_id
+
+def roundtrip(a, b):
+    patch = make_patch(a, b)
+    # Lo que viaja al navegador es JSON: el parche tiene que sobrevivir a la serialización
+    patch = json.loads(json.dumps(patch))
+    out = apply_patch(a, patch)
+    assert out == b
+    assert json.dumps(out, sort_keys=True) == json.dumps(b, sort_keys=True)   # tipos incluidos
+    return patch
+
+@pytest.mark.parametrize("a, b", [
+    ({"x": 1}, {"x": 1}),
+    ({"x": 1}, {"x": 2}),
+    ({"x": 1}, {"y": 1}),
+    ({}, {"a": {"b": [1, 2]}}),
+    ({"a": {"b": [1, 2]}}, {}),
+])
+def test_dicts(a, b):
+    roundtrip(a, b)
+
+def test_no_change_is_empty():
+    doc = {"assets": [{"name": "A", "val": 1.5}], "summary": {"rt": 0.1}}
+    assert make_patch(doc, json.loads(json.dumps(doc))) == []
+
+@pytest.mark.parametrize("key", ["a/b", "a~b", "~1", "~0", "/", "~", "a~1b/c~0", ""])
+def test_key_escaping(key):
+    patch = roundtrip({"k": {key: 1, "other": 2}}, {"k": {key: 2}})
+    assert {"op": "replace", "path": "/k/" + key.replace("~", "~0").replace("/", "~1"), "value": 2} in patch
+    roundtrip({}, {key: [1]})
+    roundtrip({key: [1]}, {})
+
+@pytest.mark.parametrize("a, b", [
+    ([1, 2, 3], [1, 2, 3, 4, 5]),            # crece
+    ([1, 2, 3, 4, 5], [1, 2]),               # encoge
+    ([1, 2, 3], []),
+    ([], [{"a": 1}, {"b": 2}]),
+    ([[1, 2], [3]], [[1], [3, 4, 5]]),       # listas anidadas
+    ([{"d": "01/01", "v": 1}], [{"d": "01/01", "v": 2}, {"d": "02/01", "v": 3}]),
+])
+def test_lists(a, b):
+    roundtrip({"l": a}, {"l": b})
+    roundtrip(a, b)   # también en la raíz
+
+@pytest.mark.parametrize("a, b", [
+    (1, 1.0), (1.0, 1), (True, 1), (0, False), (None, 0), ("1", 1),
+    ([1], {"0": 1}), ({"0": 1}, [1]), ({"a": 1}, "a"), ([1, 2], None),
+])
+def test_type_changes(a, b):
+    patch = roundtrip({"x": a}, {"x": b})
+    assert patch == [{"op": "replace", "path": "/x", "value": b}]
+    roundtrip(a, b)
+
+def _random_value(rnd, depth=0):
+    kind = rnd.choice(["int", "float", "str", "bool", "none"] + (["list", "dict"] * 2 if depth < 3 else []))
+    if kind == "int":
+        return rnd.randint(-3, 3)
+    if kind == "float":
+        return rnd.choice([0.0, 1.0, 0.5, -2.25])
+    if kind == "str":
+        return rnd.choice(["", "a", "a/b", "~", "€"])
+    if kind == "bool":
+        return rnd.random() < 0.5
+    if kind == "none":
+        return None
+    if kind == "list":
+        return [_random_value(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+    return {rnd.choice(["a", "b", "c/d", "e~f", "~1", "0"]): _random_value(rnd, depth + 1)
+            for _ in range(rnd.randint(0, 4))}
+
+def test_random_pairs():
+    rnd = random.Random(6902)
+    for _ in range(2000):
+        roundtrip(_random_value(rnd), _random_value(rnd))
+
+# ── Cadena de versiones ───────────────────────────────────────────────────────
+def _versioned(doc):
+    doc = dict(doc)
+    doc["version"] = version_id(doc)
+    return doc
+
+def _strip(doc):
+    return {k: v for k, v in doc.items() if k != "version"}
+
+def test_chained_delta_since(tmp_path):
+    vdir = str(tmp_path / "versions")
+    docs = [_versioned({"assets": [{"name": "A", "val": 100.0}], "history": [], "summary": {"n": 1}})]
+    docs.append(_versioned({**docs[-1], "assets": [{"name": "A", "val": 101.0}, {"name": "B/C", "val": 5}]}))
+    docs.append(_versioned({**docs[-1], "history": [{"date": "01/01/2026", "val": 106.0}]}))
+    docs.append(_versioned({**docs[-1], "assets": [{"name": "B/C", "val": 6}], "summary": {"n": 1, "m~": [1]}}))
+    docs.append(_versioned({k: v for k, v in docs[-1].items() if k != "history"}))
+
+    record_version(vdir, None, docs[0])
+    for prev, new in zip(docs, docs[1:]):
+        assert record_version(vdir, prev, new) > 0
+
+    # Desde cualquier versión de la cadena se llega a la última
+    for doc in docs:
+        ops = delta_since(vdir, doc["version"])
+        assert apply_patch(_strip(doc), ops) == _strip(docs[-1])
+    assert delta_since(vdir, docs[-1]["version"]) == []
+    assert delta_since(vdir, "desconocida") is None
+
+    # Repetir la misma versión no añade parches
+    assert record_version(vdir, docs[-1], docs[-1]) == 0
+    assert apply_patch(_strip(docs[0]), delta_since(vdir, docs[0]["version"])) == _strip(docs[-1])
+
+def test_chain_is_trimmed(tmp_path, monkeypatch):
+    import delta_json
+    monkeypatch.setattr(delta_json, "MAX_CHAIN", 3)
+    vdir = str(tmp_path / "versions")
+    docs = [_versioned({"n": i}) for i in range(6)]
+    record_version(vdir, None, docs[0])
+    for prev, new in zip(docs, docs[1:]):
+        record_version(vdir, prev, new)
+    assert delta_since(vdir, docs[0]["version"]) is None        # fuera de la cadena → payload completo
+    for doc in docs[2:]:
+        assert apply_patch(_strip(doc), delta_since(vdir, doc["version"])) == _strip(docs[-1])
+
+def test_regenerating_unchanged_data_keeps_the_version(tmp_path):
+    vdir = str(tmp_path / "versions")
+    base = {"assets": [{"name": "A", "val": 1.0}], "summary": {"n": 1}}
+    a = _versioned({**base, "generated": "2026-10-19T01:00:00", "summary": {"n": 1, "updated_at": "19/10/2026 01:00"}})
+    b = _versioned({**base, "generated": "2026-10-19T02:00:00", "summary": {"n": 1, "updated_at": "19/10/2026 02:00"}})
+    assert a["version"] == b["version"]
+    record_version(vdir, None, a)
+    assert record_version(vdir, a, b) == 0
+    assert delta_since(vdir, a["version"]) == []
+    c = _versioned({**b, "summary": {"n": 2, "updated_at": "19/10/2026 03:00"}})
+    assert c["version"] != a["version"]
+    assert record_version(vdir, b, c) == 2
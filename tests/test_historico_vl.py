@@ -0,0 +1,116 @@
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import actualizar_precios
+import historico_vl
+from historico_vl import backfill_isin, load_checkpoint, load_series
+
+TODAY = date(2026, 10, 19)
+
+# ISIN → días con VL (lunes a viernes) en el servidor de pruebas
+FUNDS = {
+    "ES0000000001": [(date(2023, 3, 1), TODAY)],
+    # Suspendido ~19 meses: deja exactamente un tramo de 365 días vacío
+    "ES0000000002": [(date(2018, 1, 1), date(2022, 6, 30)), (date(2024, 2, 1), TODAY)],
+    "ES0000000003": [],
+    # Dejó de publicar hace más de cuatro años
+    "ES0000000004": [(date(2015, 6, 1), date(2022, 3, 31))],
+}
+
+
+def _has_nav(isin, d):
+    return d.weekday() < 5 and any(a <= d <= b for a, b in FUNDS.get(isin, []))
+
+
+class _Historico(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        q = parse_qs(urlsplit(self.path).query)
+        isin = q["isin"][0]
+        d0, d1 = (datetime.strptime(q[k][0], "%d/%m/%Y").date() for k in ("desde", "hasta"))
+        self.requests.append((isin, d0, d1))
+        rows, d = [], d0
+        while d <= d1:
+            if _has_nav(isin, d):
+                nav = f"{10 + d.toordinal() % 97 / 10:.6f}".replace(".", ",")
+                rows.append(f"<tr><td>{d:%d/%m/%Y}</td><td class='n'>{nav}</td></tr>")
+            d += timedelta(days=1)
+        body = f"<html><table>{''.join(rows)}</table></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def quefondos(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Historico)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(actualizar_precios, "QUEFONDOS_BASE", f"http://127.0.0.1:{srv.server_port}")
+    _Historico.requests = []
+    yield _Historico.requests
+    srv.shutdown()
+
+
+def _run(isin, store, today=TODAY):
+    ck = load_checkpoint(store / historico_vl.CHECKPOINT.name)
+    added = backfill_isin(isin, ck, today, store=store)
+    return added, load_checkpoint(store / historico_vl.CHECKPOINT.name).get(isin, {})
+
+
+def test_backfill_reaches_inception(quefondos, tmp_path):
+    added, state = _run("ES0000000001", tmp_path)
+    days, navs = load_series("ES0000000001", tmp_path)
+    assert added == len(days) == len(navs)
+    assert date.fromordinal(days[0]) == date(2023, 3, 1)
+    assert date.fromordinal(days[-1]) == date(2026, 10, 19)
+    assert state["inception"] is True
+
+
+def test_one_empty_chunk_is_not_inception(quefondos, tmp_path):
+    _, state = _run("ES0000000002", tmp_path)
+    days, _ = load_series("ES0000000002", tmp_path)
+    assert date.fromordinal(days[0]) == date(2018, 1, 1)
+    assert state["inception"] is True
+
+
+def test_empty_series_never_marks_inception(quefondos, tmp_path):
+    for _ in range(3):
+        added, state = _run("ES0000000003", tmp_path)
+        assert added == 0
+        assert not state.get("inception")
+        assert "back_to" not in state
+    # Cada ejecución busca MAX_EMPTY_PROBE tramos hacia atrás desde hoy y desiste
+    probe = [r[2] for r in quefondos[:historico_vl.MAX_EMPTY_PROBE]]
+    assert len(quefondos) == 3 * historico_vl.MAX_EMPTY_PROBE
+    assert quefondos[0][2] == TODAY and probe == sorted(probe, reverse=True)
+    assert [r[2] for r in quefondos] == probe * 3
+
+
+def test_series_that_stopped_long_ago_is_backfilled(quefondos, tmp_path):
+    added, state = _run("ES0000000004", tmp_path)
+    days, _ = load_series("ES0000000004", tmp_path)
+    assert added == len(days) > 0
+    assert date.fromordinal(days[0]) == date(2015, 6, 1)
+    assert date.fromordinal(days[-1]) == date(2022, 3, 31)
+    assert state["inception"] is True
+
+
+def test_incremental_run_only_fetches_new_days(quefondos, tmp_path, monkeypatch):
+    _run("ES0000000001", tmp_path)
+    quefondos.clear()
+    later = TODAY + timedelta(days=3)
+    monkeypatch.setitem(FUNDS, "ES0000000001", [(date(2023, 3, 1), later)])
+    added, _ = _run("ES0000000001", tmp_path, today=later)
+    assert quefondos == [("ES0000000001", TODAY + timedelta(days=1), later)]
+    assert added == 3   # martes 20 a jueves 22/10/2026
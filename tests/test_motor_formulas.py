@@ -0,0 +1,157 @@
+import math
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+from motor_formulas import DIV0, NAME, REF, VALUE, Engine, XLError, recalc_workbook
+
+WORKBOOK = Path(__file__).resolve().parent.parent / "portfolio_cuadro_mandos.xlsx"
+
+
+def _engine(cells, formulas):
+    """Engine sobre un libro en memoria: una hoja "H" con constantes y fórmulas."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "H"
+    for coord, v in {**cells, **formulas}.items():
+        ws[coord] = v
+    return Engine(wb)
+
+
+def _calc(formula, **cells):
+    eng = _engine(cells, {"Z1": formula})
+    return eng.get("H", "Z1")
+
+
+# ── Libro real ────────────────────────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def books():
+    return openpyxl.load_workbook(WORKBOOK), openpyxl.load_workbook(WORKBOOK, data_only=True)
+
+
+def test_recalc_from_scratch_matches_excel_cache(books):
+    wb_formulas, wb_values = books
+    eng = Engine(wb_formulas)              # sin valores cacheados: todo está sucio
+    assert not eng.unsupported
+    done = eng.recalc()
+    assert len(done) == len(eng.formulas) == 430
+    for (sheet, r, c), got in done.items():
+        want = wb_values[sheet].cell(row=r, column=c).value
+        got = got.code if isinstance(got, XLError) else got
+        if want is None:
+            want = ""                      # openpyxl lee como None el texto vacío cacheado
+        if isinstance(want, (int, float)) and isinstance(got, (int, float)):
+            assert math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-9), (sheet, r, c)
+        else:
+            assert got == want, (sheet, r, c)
+
+
+def test_set_dirties_only_dependents(books):
+    wb_formulas, wb_values = books
+    eng = Engine(wb_formulas, wb_values)
+    g6 = wb_values["📋 ACTIVOS"]["G6"].value
+    # Sucias de partida: solo las de texto vacío (=""), que openpyxl lee como None
+    assert eng.dirty == {("📋 ACTIVOS", 30, 7)}
+    eng.set("📋 ACTIVOS", "G6", g6)
+    assert len(eng.dirty) == 103
+    eng.recalc()
+    # Mismo valor que ya tenía: lo recalculado debe coincidir con la caché
+    eng.set("📋 ACTIVOS", "G6", g6)
+    dirty = set(eng.dirty)
+    assert len(dirty) == 102
+    done = eng.recalc()
+    assert set(done) == dirty
+    for (sheet, r, c), got in done.items():
+        want = wb_values[sheet].cell(row=r, column=c).value
+        assert got == (pytest.approx(want, rel=1e-9, abs=1e-9) if want is not None else ""), (sheet, r, c)
+
+
+def test_recalc_workbook_writes_error_codes():
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = "=1/0"
+    values = openpyxl.Workbook()
+    eng, n = recalc_workbook(values, wb)
+    assert n == 1
+    assert values.active["A1"].value == "#DIV/0!"
+
+
+# ── Errores ───────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("formula, err", [
+    ("=1/0", DIV0),
+    ("=A1+1", VALUE),                      # A1 = "abc"
+    ("=SUM(1/0,2)", DIV0),
+    ("=NOPE(1)", NAME),
+    ("=INDEX(B1:B3,5)", REF),
+    ("='Otra hoja'!A1", REF),
+    ("=SQRT(-1)", XLError("#NUM!")),
+    ("=ABS(1/0)+1", DIV0),
+])
+def test_errors_propagate(formula, err):
+    assert _calc(formula, A1="abc", B1=1, B2=2, B3=3) == err
+
+
+@pytest.mark.parametrize("formula", [
+    "=INDEX(B1:B3,MATCH(3,B1:B3,0))",      # MATCH no está soportada → #NAME?
+    '=INDEX(B1:B3,"x")',
+    "=INDEX(B1:B3,1,1/0)",
+    "=ROUND(B1,1/0)",
+    '=ROUND(B1,"x")',
+    "=SUMPRODUCT()",
+])
+def test_bad_arguments_return_errors_not_exceptions(formula):
+    assert isinstance(_calc(formula, B1=1, B2=2, B3=3), XLError)
+
+
+def test_round_and_index():
+    assert _calc("=ROUND(2.5,0)") == 3
+    assert _calc("=ROUND(-2.5,0)") == -3
+    assert _calc("=ROUND(1234.5,-2)") == 1200
+    assert _calc("=ROUND(2.345,1E300)") == pytest.approx(2.345)
+    assert _calc("=INDEX(B1:B3,2)", B1=1, B2=2, B3=3) == 2
+    assert _calc("=INDEX(B1:D1,3)", B1=1, C1=2, D1=3) == 3
+
+
+def test_iferror():
+    assert _calc("=IFERROR(1/0,7)") == 7
+    assert _calc("=IFERROR(NOPE(),\"x\")") == "x"
+    assert _calc("=IFERROR(5,7)") == 5
+    assert _calc("=IFERROR(IF(1/0,1,2),3)") == 3
+
+
+# ── SUMIF ─────────────────────────────────────────────────────────────────────
+SUMIF_CELLS = dict(A1="RF", A2="RV", A3="rf", A4="Fidelity", A5=None, A6=5,
+                   B1=1, B2=2, B3=4, B4=8, B5=16, B6=32)
+
+
+@pytest.mark.parametrize("crit, total", [
+    ('"RF"', 5),                            # sin distinguir mayúsculas
+    ('"<>RF"', 58),                         # vacíos y números también son distintos de "RF"
+    ('"Fid*"', 8),
+    ('"R?"', 7),
+    ('">4"', 32),
+    ("5", 32),
+    ('""', 16),
+])
+def test_sumif_criteria(crit, total):
+    assert _calc(f"=SUMIF(A1:A6,{crit},B1:B6)", **SUMIF_CELLS) == total
+
+
+def test_sumif_without_sum_range():
+    assert _calc('=SUMIF(B1:B6,">=8")', **SUMIF_CELLS) == 56
+
+
+# ── Grafo ─────────────────────────────────────────────────────────────────────
+def test_cycle_evaluates_to_zero_and_rest_still_computes():
+    eng = _engine({"C1": 2}, {"A1": "=B1+1", "B1": "=A1+1", "D1": "=C1*3"})
+    done = eng.recalc()
+    assert done[("H", 1, 1)] == 0 and done[("H", 1, 2)] == 0
+    assert done[("H", 1, 4)] == 6
+
+
+def test_set_recomputes_downstream_in_order():
+    eng = _engine({"A1": 1}, {"B1": "=A1*2", "C1": "=B1+A1", "D1": "=5"})
+    eng.recalc()
+    eng.set("H", "A1", 10)
+    assert eng.dirty == {("H", 1, 2), ("H", 1, 3)}
+    assert eng.recalc() == {("H", 1, 2): 20, ("H", 1, 3): 30}
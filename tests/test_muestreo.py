@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from muestreo import POINT_BUDGET, TIMEFRAMES, category_history, lttb, match_name, parse_date, timeframes
+
+HISTORY_NAMES = ["GVC Gaesco 300 Places World A", "GVC Gaesco Japón FI", "GVC Gaesco RF Flexible FI A",
+                 "GVC Gaesco RF Horizonte 2027 A", "GVC Gaesco Value Minu A", "Next Tier GVC SCR"]
+
+
+def test_match_name_normalizes_abbreviations():
+    assert match_name("GVC Gaesco Japón FI", HISTORY_NAMES) == "GVC Gaesco Japón FI"
+    assert match_name("GVC Gaesco RF Horizonte 2027 Clase A", HISTORY_NAMES) == "GVC Gaesco RF Horizonte 2027 A"
+    assert match_name("GVC Gaesco Renta Fija Flexible FI A", HISTORY_NAMES) == "GVC Gaesco RF Flexible FI A"
+    assert match_name("Next Tier GVC Gaesco SCR", HISTORY_NAMES) == "Next Tier GVC SCR"
+    assert match_name("gvc gaesco japon", HISTORY_NAMES) == "GVC Gaesco Japón FI"
+
+
+def test_match_name_never_maps_unrelated_funds():
+    for name in ("GVC Gaesco Europa FI", "GVC Gaesco Bolsalíder A", "GVC Gaesco Oro y Minas",
+                 "GVC Gaesco RF Horizonte 2029 A", "Fidelity MSCI World Index P EUR Acc"):
+        assert match_name(name, HISTORY_NAMES) is None
+
+
+def test_match_name_requires_a_unique_candidate():
+    assert match_name("GVC Gaesco Japón", ["GVC Gaesco Japón FI", "Japón Clase FI"]) is None
+
+
+# ── category_history ──────────────────────────────────────────────────────────
+def test_category_history_carries_assets_over_other_markets_holidays():
+    assets = [{"name": "GVC Gaesco Japón FI", "cat": "RV", "invested": 300},
+              {"name": "GVC Gaesco 300 Places World A", "cat": "RV", "invested": 100}]
+    history = {
+        "GVC Gaesco Japón FI": [{"date": "01/10/2026", "rt": 10.0}, {"date": "03/10/2026", "rt": 12.0}],
+        "GVC Gaesco 300 Places World A": [{"date": "30/09/2026", "rt": 2.0}, {"date": "01/10/2026", "rt": 2.0},
+                                          {"date": "02/10/2026", "rt": 4.0}, {"date": "03/10/2026", "rt": 4.0}],
+    }
+    assert category_history(assets, history) == {"RV": [
+        {"date": "30/09/2026", "rt": 2.0},      # Japón aún no tiene dato: no cuenta
+        {"date": "01/10/2026", "rt": 8.0},
+        {"date": "02/10/2026", "rt": 8.5},      # festivo en Japón: sigue con su 10 %
+        {"date": "03/10/2026", "rt": 10.0},
+    ]}
+
+
+# ── LTTB y ventanas ───────────────────────────────────────────────────────────
+def _daily(start, n, value=lambda i: 100.0):
+    return [{"date": (start + timedelta(days=i)).strftime("%d/%m/%Y"), "val": value(i)} for i in range(n)]
+
+
+def test_lttb_keeps_spikes_and_endpoints():
+    pts = [100.0] * 1000
+    pts[437], pts[712] = 180.0, 20.0
+    out = lttb(pts, 120)
+    assert len(out) == 120
+    assert 180.0 in out and 20.0 in out
+    assert lttb(pts[:50], 120) == pts[:50]
+
+
+def test_timeframes_anchor_windows_to_the_last_date():
+    series = _daily(datetime(2020, 1, 1), 2000, value=lambda i: 100 + i % 7)
+    last = datetime(2020, 1, 1) + timedelta(days=1999)
+    tfs = timeframes(series[::-1] + [{"date": "?", "val": 1}, {"date": "01/01/2019", "val": None}],
+                     y=lambda p: p["val"])
+    assert tfs["1M"] == series[-33:]            # 31 días + un punto de ancla anterior
+    assert parse_date(tfs["1M"][0]["date"]) == last - timedelta(days=32)
+    for tf, days in TIMEFRAMES.items():
+        assert tfs[tf][-1] is series[-1]
+        assert len(tfs[tf]) <= POINT_BUDGET
+        if days:
+            assert parse_date(tfs[tf][0]["date"]) < last - timedelta(days=days)
+    assert tfs["ALL"][0] is series[0]
+    assert timeframes([], y=lambda p: p["val"]) == {tf: [] for tf in TIMEFRAMES}
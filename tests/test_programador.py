@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import programador
+from programador import MAX_OBS, Calendar, next_poll, publication_minute, record
+
+CAL = Calendar()
+
+
+def simulate(pub_minute, days=20, obs=()):
+    """Sondea un fondo según next_poll() durante `days` días; publica cada día hábil a pub_minute."""
+    state = {"X": {"price": 1.0, "nav_date": "2026-01-02"}}
+    if obs:
+        state["X"]["obs"] = {"quefondos": list(obs)}
+    t, end, price = datetime(2026, 1, 5), datetime(2026, 1, 5) + timedelta(days=days), 1.0
+    while True:
+        t = max(next_poll(state["X"], t, CAL), t)
+        if t >= end:
+            return state["X"]
+        st = state["X"]
+        published = t >= datetime.combine(t.date(), datetime.min.time()) + timedelta(minutes=pub_minute)
+        if published and st["nav_date"] != t.date().isoformat():
+            price = round(price + 0.01, 2)
+            record(state, "X", (price, t.date().isoformat(), "quefondos"), t)
+        else:
+            record(state, "X", (st["price"], st["nav_date"], "quefondos"), t)
+        t += timedelta(minutes=1)
+
+
+def test_early_publisher_is_learned_from_first_poll_bounds():
+    st = simulate(5 * 60)
+    assert abs(publication_minute(st) - 5 * 60) <= 15
+    # Las cotas bajan la hora hasta la real, no por debajo: de ahí en adelante hay fallos
+    assert min(st["obs"]["quefondos"]) >= 5 * 60 - 15
+
+
+def test_learned_time_moves_earlier_when_the_fund_does():
+    st = simulate(8 * 60, days=30, obs=[11 * 60] * MAX_OBS)
+    assert abs(publication_minute(st) - 8 * 60) <= 15
+
+
+def test_learns_publication_after_a_same_day_miss():
+    st = simulate(11 * 60)
+    assert abs(publication_minute(st) - 11 * 60) <= 15
+
+
+def test_hit_after_previous_day_miss_is_not_recorded():
+    state = {"X": {"price": 1.0, "nav_date": "2026-01-05"}}
+    record(state, "X", (1.0, "2026-01-05", "quefondos"), datetime(2026, 1, 5, 20, 0))
+    record(state, "X", (1.1, "2026-01-06", "quefondos"), datetime(2026, 1, 6, 9, 30))
+    # No es un punto medio entre días, solo una cota: salió antes de las 9:30
+    assert state["X"]["obs"] == {"quefondos": [9 * 60 + 30]}
+    assert state["X"]["last_new"] == date(2026, 1, 6).isoformat()
+
+
+def test_late_first_poll_hit_says_nothing():
+    state = {"X": {"price": 1.0, "nav_date": "2026-01-05", "obs": {"quefondos": [600, 610]}}}
+    record(state, "X", (1.1, "2026-01-06", "quefondos"), datetime(2026, 1, 6, 15, 0))
+    assert state["X"]["obs"] == {"quefondos": [600, 610]}
+
+
+# ── Calendario ────────────────────────────────────────────────────────────────
+def test_national_holidays_only_for_that_country():
+    inmaculada, viernes_santo = date(2026, 12, 8), date(2026, 4, 3)
+    assert not CAL.is_business_day(inmaculada, "ES")
+    assert CAL.is_business_day(inmaculada, "IE") and CAL.is_business_day(inmaculada, "LU")
+    for country in ("ES", "IE", "LU", None):
+        assert not CAL.is_business_day(viernes_santo, country)
+        assert not CAL.is_business_day(date(2026, 12, 25), country)
+    assert CAL.next_business_day(date(2026, 12, 7), "ES") == date(2026, 12, 9)
+    assert CAL.next_business_day(date(2026, 12, 7), "IE") == date(2026, 12, 8)
+
+
+def test_next_poll_uses_the_fund_calendar():
+    st = {"last_new": "2026-12-07"}
+    now = datetime(2026, 12, 7, 12, 0)
+    assert next_poll(st, now, CAL, "ES").date() == date(2026, 12, 9)
+    assert next_poll(st, now, CAL, "LU").date() == date(2026, 12, 8)
+
+
+def test_holiday_file_adds_and_removes(tmp_path):
+    f = tmp_path / "festivos.txt"
+    f.write_text("06-23   # San Juan (LU)\n2026-03-19\n-12-08\n-2026-04-03\n\n", encoding="utf-8")
+    cal = Calendar(f)
+    assert not cal.is_business_day(date(2026, 6, 23), "IE")
+    assert not cal.is_business_day(date(2027, 6, 23), "IE")
+    assert not cal.is_business_day(date(2026, 3, 19), "ES")
+    assert cal.is_business_day(date(2026, 12, 8), "ES")
+    assert cal.is_business_day(date(2026, 4, 3), "ES")
+    assert not cal.is_business_day(date(2027, 3, 26), "ES")      # Viernes Santo de otro año
+
+
+@pytest.mark.parametrize("argv", [["--festivos"], ["x.xlsx", "--festivos", "--once"], ["--festivos", "no-existe.txt"]])
+def test_bad_festivos_argument_exits_cleanly(argv, capsys):
+    with pytest.raises(SystemExit) as e:
+        programador.main(argv)
+    assert e.value.code == 1
+    assert "❌" in capsys.readouterr().out
@@ -0,0 +1,139 @@
+import asyncio
+import gzip
+import http.client
+import importlib
+import json
+import socket
+import sys
+import threading
+
+import pytest
+
+import servidor_local
+
+INDEXA = "<html><script id='portfolioData'></script></html>"
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    public = tmp_path / "public"
+    public.mkdir()
+    (public / "indexa.html").write_text(INDEXA + " " * 2000, encoding="utf-8")
+    (public / "index.html").write_text("<html>SheetJS</html>", encoding="utf-8")
+    (public / "data.json").write_text(json.dumps({"version": "v1", "summary": {"total_val": 1}}), encoding="utf-8")
+    (tmp_path / "secreto.txt").write_text("no", encoding="utf-8")
+    monkeypatch.setattr(servidor_local, "PUBLIC_DIR", str(public))
+    monkeypatch.setattr(servidor_local, "DATA_FILE", str(public / "data.json"))
+    monkeypatch.setattr(servidor_local, "VERSIONS_DIR", str(public / "versions"))
+    for memo in (servidor_local._cache, servidor_local._deltas):
+        memo.clear()
+    servidor_local._data.update(mtime=None, data=None)
+
+    loop = asyncio.new_event_loop()
+    srv = loop.run_until_complete(asyncio.start_server(servidor_local.handle, "127.0.0.1", 0))
+    port = srv.sockets[0].getsockname()[1]
+    t = threading.Thread(target=loop.run_forever, daemon=True)
+    t.start()
+    yield port
+
+    async def stop():
+        srv.close()
+        await srv.wait_closed()
+        await asyncio.sleep(0.05)            # que terminen los handle() de conexiones cerradas
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    t.join()
+    loop.close()
+
+
+def _get(port, path, method="GET", **headers):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request(method, path, headers=headers)
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+def _raw(port, data):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as s:
+        s.sendall(data)
+        out = b""
+        while chunk := s.recv(65536):
+            out += chunk
+    return out
+
+
+def test_import_ignores_argv(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["pytest", "-q", "tests"])
+    assert importlib.reload(servidor_local).PORT == 8000
+
+
+def test_root_serves_the_data_json_dashboard(server):
+    resp, body = _get(server, "/")
+    assert resp.status == 200
+    assert b"portfolioData" in body
+    assert _get(server, "/index.html")[1] == b"<html>SheetJS</html>"
+
+
+def test_etag_revalidation(server):
+    resp, _ = _get(server, "/indexa.html")
+    etag = resp.getheader("ETag")
+    resp, body = _get(server, "/indexa.html", **{"If-None-Match": etag})
+    assert (resp.status, body) == (304, b"")
+    assert resp.getheader("Content-Length") is None
+    assert resp.getheader("ETag") == etag
+    assert _get(server, "/indexa.html", **{"If-None-Match": "W/" + etag})[0].status == 304
+    assert _get(server, "/indexa.html", **{"If-None-Match": '"otro"'})[0].status == 200
+
+
+def test_accept_encoding_negotiation(server):
+    resp, body = _get(server, "/indexa.html", **{"Accept-Encoding": "gzip"})
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body).decode().startswith(INDEXA)
+    gz_etag = resp.getheader("ETag")
+
+    for accept in ("gzip;q=0", "br;q=0, gzip;q=0", "identity", "*;q=0"):
+        resp, body = _get(server, "/indexa.html", **{"Accept-Encoding": accept})
+        assert resp.getheader("Content-Encoding") is None, accept
+        assert body.decode().startswith(INDEXA)
+        assert resp.getheader("ETag") != gz_etag
+    assert _get(server, "/indexa.html", **{"Accept-Encoding": "*"})[0].getheader("Content-Encoding") in ("gzip", "br")
+
+
+def test_head_has_headers_but_no_body(server):
+    get, body = _get(server, "/indexa.html")
+    head, empty = _get(server, "/indexa.html", method="HEAD")
+    assert head.status == 200 and empty == b""
+    assert head.getheader("Content-Length") == get.getheader("Content-Length") == str(len(body))
+    assert head.getheader("ETag") == get.getheader("ETag")
+
+
+def test_405_closes_the_connection(server):
+    # El cuerpo del POST no se lee: no debe interpretarse como una segunda petición
+    out = _raw(server, b"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 24\r\n\r\n"
+                       b"GET /index.html HTTP/1.1\r\n\r\n")
+    assert out.startswith(b"HTTP/1.1 405 ")
+    assert b"Allow: GET, HEAD" in out and b"Connection: close" in out
+    assert out.count(b"HTTP/1.1 ") == 1
+
+
+def test_keep_alive_serves_pipelined_requests(server):
+    out = _raw(server, b"GET /index.html HTTP/1.1\r\n\r\nGET /index.html HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert out.count(b"HTTP/1.1 200 ") == 2
+
+
+@pytest.mark.parametrize("path", ["/../secreto.txt", "/%2e%2e/secreto.txt", "/..%2fsecreto.txt",
+                                  "/%2e%2e%2f%2e%2e%2fetc/passwd", "/public/../../secreto.txt"])
+def test_path_traversal_is_rejected(server, path):
+    out = _raw(server, f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    assert out.startswith(b"HTTP/1.1 404 ")
+    assert b"no" not in out.split(b"\r\n\r\n", 1)[1]
+
+
+def test_delta_for_the_current_version_is_empty(server):
+    resp, body = _get(server, "/api/delta?since=v1")
+    assert json.loads(body) == {"version": "v1", "patch": []}
+    resp, body = _get(server, "/api/delta?since=desconocida")
+    assert json.loads(body)["full"]["summary"] == {"total_val": 1}
+    assert _get(server, "/api/summary")[0].status == 404
@@ -0,0 +1,37 @@
+from vistas import view, views
+
+ASSETS = [
+    {"name": "Bono",    "cat": "RF",  "invested": 100.0, "val": 110.0, "rt": 0.10,  "ytd": 0.02, "mtd": 0.01},
+    {"name": "Bolsa A", "cat": "RV",  "invested": 200.0, "val": 180.0, "rt": -0.10, "ytd": 0.05, "mtd": 0.00},
+    {"name": "Bolsa B", "cat": "RV",  "invested": 50.0,  "val": 75.0,  "rt": 0.50,  "ytd": 0.15, "mtd": 0.02},
+    {"name": "Bitcoin", "cat": "CR",  "invested": 10.0,  "val": 0.0,   "rt": -1.00, "ytd": 0.00, "mtd": 0.00},
+    {"name": "Next",    "cat": "SCR", "invested": 40.0,  "val": 44.0,  "rt": 0.10,  "ytd": 0.00, "mtd": 0.00},
+]
+
+
+def test_cr_filter_groups_crypto_and_venture_capital():
+    v = views(ASSETS)
+    assert v["CR"]["idx"] == [3, 4]
+    assert v["CR"]["count"] == 2
+    assert v["CR"]["bars"]["cats"] == ["CR", "SCR"]
+    assert v["all"]["count"] == len(ASSETS)
+    assert v["RV"]["idx"] == [1, 2]
+
+
+def test_ranking_is_by_total_return():
+    assert views(ASSETS)["all"]["ranking"] == [2, 0, 4, 1, 3]
+    assert view(ASSETS, ("RV",))["ranking"] == [2, 1]
+
+
+def test_bars_and_donut():
+    v = views(ASSETS)
+    assert v["RV"]["bars"] == {"cats": ["RV"], "rt": [2.0], "ytd": [10.0], "mtd": [1.0]}   # (255−250)/250
+    assert v["all"]["donut"] == {"by": "cat", "keys": ["RF", "RV", "CR", "SCR"], "val": [110.0, 255.0, 0.0, 44.0]}
+    assert v["RV"]["donut"] == {"by": "asset", "keys": [1, 2], "val": [180.0, 75.0]}
+
+
+def test_treemap_skips_assets_without_value():
+    groups = views(ASSETS)["all"]["treemap"]
+    assert [(g["cat"], g["items"], g["total"]) for g in groups] == [
+        ("RF", [0], 110.0), ("RV", [1, 2], 255.0), ("SCR", [4], 44.0)]   # CR: solo Bitcoin, a 0 €
+    assert views(ASSETS)["CR"]["treemap"] == [{"cat": "SCR", "total": 44.0, "items": [4]}]
@@ -0,0 +1,61 @@
+"""
+vistas.py — Modelos de vista por filtro del dashboard (Toda la cartera / RF / RV / CR)
+
+setFilter() solo elige views[filtro] y actualiza en su sitio las gráficas ya creadas
+(chart.update()): las barras por categoría, la dona, el ranking ordenado y los grupos
+del treemap vienen calculados aquí en vez de refiltrar y reordenar ASSETS en cada cambio.
+Los activos se referencian por su índice en data.json["assets"].
+"""
+FILTERS = {    # mismo reparto que FILTER_CATS en indexa.html (buildViews, sin "views")
+    "all": ("RF", "RV", "CR", "SCR"),
+    "RF":  ("RF",),
+    "RV":  ("RV",),
+    "CR":  ("CR", "SCR"),    # el botón "Cripto" agrupa cripto y capital riesgo, como su KPI
+}
+
+def _pct(v):
+    return round(v * 100, 2)
+
+def view(assets, cats, donut_by_cat=False):
+    """Modelo de vista de los activos cuya categoría está en `cats`."""
+    idx = [i for i, a in enumerate(assets) if a["cat"] in cats]
+
+    # Barras por categoría, ya en % y redondeadas para pintar (YTD/MTD: media simple)
+    present = [c for c in cats if any(assets[i]["cat"] == c for i in idx)]
+    bars = {"cats": present, "rt": [], "ytd": [], "mtd": []}
+    for c in present:
+        g = [assets[i] for i in idx if assets[i]["cat"] == c]
+        g_inv = sum(a["invested"] for a in g)
+        g_val = sum(a["val"] for a in g)
+        bars["rt"].append(_pct((g_val - g_inv) / g_inv) if g_inv else 0)
+        bars["ytd"].append(_pct(sum(a["ytd"] for a in g) / len(g)))
+        bars["mtd"].append(_pct(sum(a["mtd"] for a in g) / len(g)))
+
+    # Dona: por categoría en la cartera completa, por activo dentro de un filtro
+    if donut_by_cat:
+        donut = {"by": "cat", "keys": present,
+                 "val": [round(sum(assets[i]["val"] for i in idx if assets[i]["cat"] == c), 2) for c in present]}
+    else:
+        donut = {"by": "asset", "keys": idx, "val": [assets[i]["val"] for i in idx]}
+
+    # Treemap: una columna por categoría (ancho según su total) con sus activos de mayor a menor
+    groups = []
+    for c in present:
+        items = sorted((i for i in idx if assets[i]["cat"] == c and assets[i]["val"] > 0),
+                       key=lambda i: assets[i]["val"], reverse=True)
+        total = sum(assets[i]["val"] for i in items)
+        if items:
+            groups.append({"cat": c, "total": round(total, 2), "items": items})
+
+    return {
+        "count": len(idx),
+        "idx": idx,
+        "bars": bars,
+        "donut": donut,
+        "ranking": sorted(idx, key=lambda i: assets[i]["rt"], reverse=True),
+        "treemap": groups,
+    }
+
+def views(assets):
+    """Bloque "views" de data.json: {filtro: modelo de vista}."""
+    return {f: view(assets, cats, donut_by_cat=f == "all") for f, cats in FILTERS.items()}